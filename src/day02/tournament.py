@@ -1,4 +1,5 @@
-from typing import Iterable, Tuple, Union, TypeVar
+from typing import Iterable, Iterator, Tuple, Union, TypeVar, Dict, BinaryIO, List, Optional
+import concurrent.futures
 import pathlib
 import os
 
@@ -8,19 +9,29 @@ my_selection_score = dict(X=1, Y=2, Z=3)
 
 round_score = dict(AX=3, BX=0, CX=6, AY=6, BY=3, CY=0, AZ=0, BZ=6, CZ=3)
 
-final_score = {
-    k: round_score[k] + my_selection_score[k[-1]]
-    for k in round_score
-}
+def compile_rule_set(
+        round_score: Dict[str, int],
+        my_selection_score: Dict[str, int],
+        round_redirection_map: Optional[Dict[str, str]] = None
+    ) -> Dict[str, int]:
+    """Compile a scoring rule set into a lookup table of final score per round key (e.g. 'AY')
+
+    If round_redirection_map is given, each round key is first mapped to the round actually played.
+    """
+    if round_redirection_map is None:
+        round_redirection_map = {k: k for k in round_score}
+    return {
+        k: round_score[played] + my_selection_score[played[-1]]
+        for k, played in round_redirection_map.items()
+    }
+
+final_score = compile_rule_set(round_score, my_selection_score)
 
 # X: I want to lose
 # Y: I want to draw
 # Z: I want to win
 round_redirection_map = dict(AX='AZ', BX='BX', CX='CY', AY='AX', BY='BY', CY='CZ', AZ='AY', BZ='BZ', CZ='CX')
-sneaky_final_score = {
-    k: round_score[round_redirection_map[k]] + my_selection_score[round_redirection_map[k][-1]]
-    for k in round_redirection_map
-}
+sneaky_final_score = compile_rule_set(round_score, my_selection_score, round_redirection_map)
 
 def total_final_score(rounds: Iterable[Tuple[str, str]]) -> int:
     return sum(final_score[f"{round[0]}{round[1]}"] for round in rounds)
@@ -28,6 +39,135 @@ def total_final_score(rounds: Iterable[Tuple[str, str]]) -> int:
 def total_final_score_sneaky(rounds: Iterable[Tuple[str, str]]) -> int:
     return sum(sneaky_final_score[f"{round[0]}{round[1]}"] for round in rounds)
 
+def total_final_scores(rounds: Iterable[Tuple[str, str]]) -> Tuple[int, int]:
+    """Score rounds under both strategies in a single pass: (total_final_score, total_final_score_sneaky)"""
+    score = 0
+    sneaky_score = 0
+    for round in rounds:
+        key = f"{round[0]}{round[1]}"
+        score += final_score[key]
+        sneaky_score += sneaky_final_score[key]
+    return score, sneaky_score
+
+# byte patterns for each of the 9 possible rounds, as they appear in a rounds file ("A X\n")
+round_key_bytes = {
+    k: f"{k[0]} {k[1]}".encode('ascii')
+    for k in final_score
+}
+
+def round_key_counts_from_bytes(data: bytes) -> Dict[str, int]:
+    """Histogram of the 9 possible rounds in raw rounds-file bytes, counted without decoding each line
+
+    Raises ValueError unless every non-blank line is exactly one known round, so corrupt input is never
+    silently undercounted: all bytes other than line endings must belong to a counted round, and each
+    round must be its own line (two whitespace-separated tokens).
+    """
+    counts = {k: data.count(pattern) for k, pattern in round_key_bytes.items()}
+    num_rounds = sum(counts.values())
+    num_carriage_returns = data.count(b'\r')
+    num_lines = data.count(b'\n')
+    num_line_ending_bytes = num_lines + num_carriage_returns
+    if (
+        num_carriage_returns != data.count(b'\r\n')
+        or len(data) - num_line_ending_bytes != 3 * num_rounds
+        or len(data.split()) != 2 * num_rounds
+    ):
+        raise ValueError(f"Malformed rounds data: {num_rounds} rounds recognised in a chunk of {len(data)} bytes and {num_lines} newlines")
+    return counts
+
+def iter_newline_aligned_chunks(f: BinaryIO, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Yield chunks of roughly chunk_size bytes, each extended to end on a newline so no round is split"""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        if not chunk.endswith(b'\n'):
+            chunk += f.readline()
+        yield chunk
+
+def round_key_counts_from_file(filepath: Union[PathT, str], chunk_size: int = 1 << 20) -> Dict[str, int]:
+    p = pathlib.Path(filepath)
+    assert p.exists(), f"Expected file containing rounds, got {p}"
+    counts = dict.fromkeys(round_key_bytes, 0)
+    with open(p, 'rb') as f:
+        for chunk in iter_newline_aligned_chunks(f, chunk_size):
+            for k, n in round_key_counts_from_bytes(chunk).items():
+                counts[k] += n
+    return counts
+
+def shard_offsets(filepath: Union[PathT, str], num_shards: int) -> List[Tuple[int, int]]:
+    """Split a file into up to num_shards (start, end) byte ranges, each beginning just after a newline"""
+    assert num_shards > 0, f"Expected at least one shard, got {num_shards}"
+    p = pathlib.Path(filepath)
+    size = p.stat().st_size
+    boundaries = [0]
+    with open(p, 'rb') as f:
+        for i in range(1, num_shards):
+            f.seek(max(i * size // num_shards, boundaries[-1]))
+            f.readline()
+            boundary = min(f.tell(), size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def round_key_counts_from_shard(filepath: Union[PathT, str], start: int, end: int, chunk_size: int = 1 << 20) -> Dict[str, int]:
+    """Histogram of rounds within the newline-aligned byte range [start, end) of a rounds file
+
+    Each chunk is validated by round_key_counts_from_bytes, so a malformed line raises ValueError.
+    """
+    counts = dict.fromkeys(round_key_bytes, 0)
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            if not chunk.endswith(b'\n'):
+                chunk += f.readline()
+            remaining -= len(chunk)
+            for k, n in round_key_counts_from_bytes(chunk).items():
+                counts[k] += n
+    return counts
+
+def round_key_counts_from_file_parallel(filepath: Union[PathT, str], processes: Optional[int] = None, chunk_size: int = 1 << 20) -> Dict[str, int]:
+    """As round_key_counts_from_file, but score newline-aligned shards in a process pool and reduce the counts
+
+    A malformed line in any shard raises ValueError here, as in the serial path.
+    """
+    p = pathlib.Path(filepath)
+    assert p.exists(), f"Expected file containing rounds, got {p}"
+    processes = processes or os.cpu_count() or 1
+    shards = shard_offsets(p, processes)
+    counts = dict.fromkeys(round_key_bytes, 0)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(round_key_counts_from_shard, str(p), start, end, chunk_size)
+            for start, end in shards
+        ]
+        for future in futures:
+            for k, n in future.result().items():
+                counts[k] += n
+    return counts
+
+def score_counts_against_rule_sets(counts: Dict[str, int], compiled_rule_sets: Iterable[Dict[str, int]]) -> List[int]:
+    """Total score of a round histogram under each compiled rule set, in one pass over the histogram"""
+    compiled_rule_sets = list(compiled_rule_sets)
+    totals = [0] * len(compiled_rule_sets)
+    for k, n in counts.items():
+        if n == 0:
+            continue
+        for i, table in enumerate(compiled_rule_sets):
+            totals[i] += table[k] * n
+    return totals
+
+def total_final_scores_from_counts(counts: Dict[str, int]) -> Tuple[int, int]:
+    """Score a round histogram under both strategies: (total_final_score, total_final_score_sneaky)"""
+    score, sneaky_score = score_counts_against_rule_sets(counts, (final_score, sneaky_final_score))
+    return score, sneaky_score
+
 def rounds_from_file(filepath: Union[PathT, str]) -> Iterable[Tuple[str, str]]:
     p = pathlib.Path(filepath)
     assert p.exists(), f"Expected file containing rounds, got {p}"
@@ -35,16 +175,26 @@ def rounds_from_file(filepath: Union[PathT, str]) -> Iterable[Tuple[str, str]]:
         lines = [tuple(line.rstrip().split(' ')) for line in f.readlines()]
     return lines
 
+def iter_rounds_from_file(filepath: Union[PathT, str]) -> Iterator[Tuple[str, str]]:
+    """Lazily yield rounds from a file, one line at a time, so memory stays flat regardless of file size"""
+    p = pathlib.Path(filepath)
+    assert p.exists(), f"Expected file containing rounds, got {p}"
+    with open(p, 'r') as f:
+        for line in f:
+            line = line.rstrip()
+            if line == '':
+                continue
+            yield tuple(line.split(' '))
+
 def main():
     file = os.environ['TOURNAMENTS_FILE']
-    rounds = rounds_from_file(file)
+    rounds = iter_rounds_from_file(file)
 
+    # both parts in a single pass over the file
     # part 1 - assume X, Y, Z specify my response
-    score = total_final_score(rounds)
-    print(f"Score: {score}")
-
     # part 2 - X, Y, Z specify whether we want to lose, draw, or win
-    sneaky_score = total_final_score_sneaky(rounds)
+    score, sneaky_score = total_final_scores(rounds)
+    print(f"Score: {score}")
     print(f"Sneaky score: {sneaky_score}")
 
 if __name__ == '__main__':
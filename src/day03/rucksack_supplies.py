@@ -1,5 +1,11 @@
-from typing import Tuple, Iterable, TypeVar, Union, List
+from typing import Tuple, Iterable, Iterator, TypeVar, Union, List, Optional, Dict
+import collections
+import concurrent.futures
+import itertools
 import string
+import time
+import functools
+import operator
 import pathlib
 import os
 
@@ -12,6 +18,25 @@ def get_rucksacks_from_file(filepath: Union[PathT, str]) -> Iterable[str]:
         lines = [line.rstrip() for line in f.readlines()]
     return lines
 
+def iter_rucksacks_from_file(filepath: Union[PathT, str]) -> Iterator[str]:
+    """Lazily yield rucksacks from a file, one line at a time"""
+    p = pathlib.Path(filepath)
+    assert p.exists(), f"Expected file to exist, got {filepath}"
+    with open(p, 'r') as f:
+        for line in f:
+            yield line.rstrip()
+
+def iter_three_elf_groups_from_rucksacks(rucksacks: Iterable[str]) -> Iterator[List[str]]:
+    """As get_three_elf_groups_from_rucksacks, but yield each group as soon as it is complete"""
+    current_group = []
+    for rucksack in rucksacks:
+        current_group.append(rucksack)
+        if len(current_group) == 3:
+            yield current_group
+            current_group = []
+    if current_group:
+        raise RuntimeError(f"Insufficient elfs to populate final three-elf group")
+
 def get_three_elf_groups_from_rucksacks(rucksacks: Iterable[str]) -> Iterable[List[str]]:
     three_elf_groups = []
     for i, rucksack in enumerate(rucksacks):
@@ -72,18 +97,123 @@ def get_three_elf_group_badge_priority(three_elf_group: List[str]) -> int:
 def get_total_three_elf_group_badge_priority(rucksacks: Iterable[str]) -> int:
     return sum(get_three_elf_group_badge_priority(rucksack) for rucksack in get_three_elf_groups_from_rucksacks(rucksacks))
 
+# bitmask representation: each item is a single bit, at the index of its priority
+item_bit = {
+    letter: 1 << priority
+    for letter, priority in item_priority.items()
+}
+
+def get_items_mask(items: str) -> int:
+    """Bitmask of the distinct items in a compartment or rucksack"""
+    return functools.reduce(operator.or_, map(item_bit.__getitem__, items), 0)
+
+def get_mask_priority(mask: int) -> int:
+    """Priority of the single item remaining in an intersection mask"""
+    if mask == 0:
+        raise RuntimeError(f"Expected one item to remain in intersection, none found")
+    return mask.bit_length() - 1
+
+def get_rucksack_item_priority_bitmask(rucksack_manifest: str) -> int:
+    compartment_A, compartment_B = get_rucksack_compartments(rucksack_manifest)
+    return get_mask_priority(get_items_mask(compartment_A) & get_items_mask(compartment_B))
+
+def get_total_rucksack_item_priority_bitmask(rucksacks: Iterable[str]) -> int:
+    return sum(map(get_rucksack_item_priority_bitmask, rucksacks))
+
+def get_three_elf_group_badge_priority_bitmask(three_elf_group: List[str]) -> int:
+    A, B, C = three_elf_group
+    return get_mask_priority(get_items_mask(A) & get_items_mask(B) & get_items_mask(C))
+
+def get_total_three_elf_group_badge_priority_bitmask(rucksacks: Iterable[str]) -> int:
+    total = 0
+    group_mask = 0
+    i = -1
+    for i, rucksack in enumerate(rucksacks):
+        mask = get_items_mask(rucksack)
+        if i % 3 == 0:
+            group_mask = mask
+        else:
+            group_mask &= mask
+        if i % 3 == 2:
+            total += get_mask_priority(group_mask)
+    if not i % 3 == 2:
+        raise RuntimeError(f"Insufficient elfs to populate final three-elf group")
+    return total
+
+def get_total_priorities(rucksacks: Iterable[str]) -> Tuple[int, int]:
+    """Single pass over rucksacks with bounded memory: (total item priority, total three-elf group badge priority)"""
+    total_priority = 0
+    total_badge_priority = 0
+    for three_elf_group in iter_three_elf_groups_from_rucksacks(rucksacks):
+        total_priority += sum(map(get_rucksack_item_priority_bitmask, three_elf_group))
+        total_badge_priority += get_three_elf_group_badge_priority_bitmask(three_elf_group)
+    return total_priority, total_badge_priority
+
+def iter_rucksack_chunks(rucksacks: Iterable[str], groups_per_chunk: int) -> Iterator[List[str]]:
+    """Yield lists of rucksacks, each a whole number of three-elf groups long (except possibly the last)"""
+    assert groups_per_chunk > 0, f"Expected at least one group per chunk, got {groups_per_chunk}"
+    rucksacks = iter(rucksacks)
+    while True:
+        chunk = list(itertools.islice(rucksacks, 3 * groups_per_chunk))
+        if not chunk:
+            return
+        yield chunk
+
+def get_total_priorities_parallel(rucksacks: Iterable[str], processes: Optional[int] = None, groups_per_chunk: int = 10000, max_in_flight: Optional[int] = None) -> Tuple[int, int]:
+    """As get_total_priorities, but compute each chunk of whole three-elf groups in a process pool
+
+    At most max_in_flight chunks (default: twice the worker count) are submitted but not yet summed, so
+    memory stays bounded while rucksacks is consumed lazily.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * processes
+    total_priority = 0
+    total_badge_priority = 0
+    in_flight = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        for chunk in iter_rucksack_chunks(rucksacks, groups_per_chunk):
+            if len(in_flight) >= max_in_flight:
+                chunk_priority, chunk_badge_priority = in_flight.popleft().result()
+                total_priority += chunk_priority
+                total_badge_priority += chunk_badge_priority
+            in_flight.append(executor.submit(get_total_priorities, chunk))
+        for future in in_flight:
+            chunk_priority, chunk_badge_priority = future.result()
+            total_priority += chunk_priority
+            total_badge_priority += chunk_badge_priority
+    return total_priority, total_badge_priority
+
+def benchmark_get_total_priorities_parallel(filepath: Union[PathT, str], worker_counts: Iterable[int] = (1, 2, 4, 8), groups_per_chunk: int = 10000) -> Dict[int, float]:
+    """Throughput (rucksacks per second) of get_total_priorities_parallel on a file, for each worker count"""
+    rucksacks = get_rucksacks_from_file(filepath)
+    throughput = dict()
+    for processes in worker_counts:
+        start = time.perf_counter()
+        get_total_priorities_parallel(rucksacks, processes=processes, groups_per_chunk=groups_per_chunk)
+        elapsed = time.perf_counter() - start
+        throughput[processes] = len(rucksacks) / elapsed
+    return throughput
+
 def main():
     filepath = os.environ['RUCKSACK_FILE']
     assert pathlib.Path(filepath).exists(), f"Expected file to exist, got {filepath}"
 
-    rucksacks = get_rucksacks_from_file(filepath)
+    if 'RUCKSACK_BENCHMARK' in os.environ:
+        for processes, rate in benchmark_get_total_priorities_parallel(filepath).items():
+            print(f"{processes} workers: {rate:.0f} rucksacks/s")
+        return
 
-    # part 1 - total priority of items in rucksacks
-    total_priority = get_total_rucksack_item_priority(rucksacks)
-    print(f"Total priority (part 1): {total_priority}")
+    rucksacks = iter_rucksacks_from_file(filepath)
 
+    # part 1 - total priority of items in rucksacks
     # part 2 - total badge priority of three-elf groups
-    total_badge_priority = get_total_three_elf_group_badge_priority(rucksacks)
+    # RUCKSACK_PROCESSES=n computes both in a pool of n worker processes (0 for one per CPU)
+    if 'RUCKSACK_PROCESSES' in os.environ:
+        processes = int(os.environ['RUCKSACK_PROCESSES']) or None
+        total_priority, total_badge_priority = get_total_priorities_parallel(rucksacks, processes=processes)
+    else:
+        total_priority, total_badge_priority = get_total_priorities(rucksacks)
+    print(f"Total priority (part 1): {total_priority}")
     print(f"Total badge priority (part 2): {total_badge_priority}")
 
 if __name__ == '__main__':
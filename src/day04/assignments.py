@@ -1,6 +1,10 @@
-from typing import TypeVar, Union, Iterable, Tuple
+from typing import TypeVar, Union, Iterable, Tuple, NamedTuple, List, Callable
+import array
+import bisect
+import operator
 import pathlib
 import os
+import sys
 
 PathT = TypeVar('PathT', bound=pathlib.Path)
 
@@ -43,17 +47,160 @@ def elf_assignments_with_partially_wasted_elf(assignments: Iterable[Tuple[Tuple,
 def count_assignments(assignments: Iterable[Tuple[Tuple, Tuple]]) -> int:
     return len(assignments)
 
+class AssignmentColumns(NamedTuple):
+    """Column-oriented assignments: one integer array per section bound, indexed by assignment pair"""
+    start0: array.array
+    end0: array.array
+    start1: array.array
+    end1: array.array
+
+    def __len__(self) -> int:
+        return len(self.start0)
+
+def assignment_columns_from_assignments(assignments: Iterable[Tuple[Tuple, Tuple]]) -> AssignmentColumns:
+    columns = AssignmentColumns(*(array.array('q') for _ in range(4)))
+    for (start0, end0), (start1, end1) in assignments:
+        columns.start0.append(start0)
+        columns.end0.append(end0)
+        columns.start1.append(start1)
+        columns.end1.append(end1)
+    return columns
+
+def assignment_columns_from_file(filepath: Union[PathT, str]) -> AssignmentColumns:
+    """Parse a file straight into columns, without building a tuple per assignment pair"""
+    p = pathlib.Path(filepath)
+    assert p.exists(), f"Elf assignments file not found: {p}"
+    with open(p, 'r') as f:
+        text = f.read()
+    values = array.array('q', map(int, text.translate({ord(','): ' ', ord('-'): ' '}).split()))
+    assert len(values) % 4 == 0, f"Expected four section bounds per assignment pair, got {len(values)} values"
+    return AssignmentColumns(values[0::4], values[1::4], values[2::4], values[3::4])
+
+def count_fully_wasted_elf_assignments(columns: AssignmentColumns) -> int:
+    """Vectorized count of assignment_contains_fully_wasted_elf over all columns
+
+    One range contains the other exactly when the starts and the ends differ in opposite directions (or not at all).
+    """
+    start_diffs = map(operator.sub, columns.start0, columns.start1)
+    end_diffs = map(operator.sub, columns.end0, columns.end1)
+    return sum(map((0).__ge__, map(operator.mul, start_diffs, end_diffs)))
+
+def count_partially_wasted_elf_assignments(columns: AssignmentColumns) -> int:
+    """Vectorized count of assignment_contains_partially_wasted_elf over all columns"""
+    latest_starts = map(max, columns.start0, columns.start1)
+    earliest_ends = map(min, columns.end0, columns.end1)
+    return sum(map(operator.le, latest_starts, earliest_ends))
+
+class SectionIndex:
+    """Index over every elf's section range across a roster, for cross-pair overlap and containment queries
+
+    Ranges are kept sorted by first section, alongside segment trees of the min/max last section over each
+    block of that order. A query bisects the first sections, then descends only into blocks that can hold
+    a match, so each query costs O(log n) plus O(log n) per reported range.
+    Ranges are reported as (assignment index, elf index within the pair), ordered by first section.
+    """
+
+    def __init__(self, assignments: Iterable[Tuple[Tuple, Tuple]]):
+        ranges = sorted(
+            (sections[0], sections[1], assignment_index, elf_index)
+            for assignment_index, assignment in enumerate(assignments)
+            for elf_index, sections in enumerate(assignment)
+        )
+        self._firsts = [r[0] for r in ranges]
+        self._lasts = [r[1] for r in ranges]
+        self._ids = [(r[2], r[3]) for r in ranges]
+        self._leaves = 1
+        while self._leaves < len(ranges):
+            self._leaves *= 2
+        self._min_last = [float('inf')] * (2 * self._leaves)
+        self._max_last = [float('-inf')] * (2 * self._leaves)
+        for i, last in enumerate(self._lasts):
+            self._min_last[self._leaves + i] = last
+            self._max_last[self._leaves + i] = last
+        for node in range(self._leaves - 1, 0, -1):
+            self._min_last[node] = min(self._min_last[2 * node], self._min_last[2 * node + 1])
+            self._max_last[node] = max(self._max_last[2 * node], self._max_last[2 * node + 1])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _report(self, lo: int, hi: int, prune: Callable[[int], bool], keep: Callable[[int], bool]) -> List[Tuple[int, int]]:
+        """Ranges at sorted positions [lo, hi) whose last section satisfies keep, skipping subtrees where prune(node)"""
+        found = []
+        stack = [(1, 0, self._leaves)]
+        while stack:
+            node, node_lo, node_hi = stack.pop()
+            if node_hi <= lo or node_lo >= hi or prune(node):
+                continue
+            if node >= self._leaves:
+                if keep(self._lasts[node_lo]):
+                    found.append(node_lo)
+                continue
+            middle = (node_lo + node_hi) // 2
+            stack.append((2 * node + 1, middle, node_hi))
+            stack.append((2 * node, node_lo, middle))
+        return [self._ids[i] for i in found]
+
+    def overlapping(self, first_section: int, last_section: int) -> List[Tuple[int, int]]:
+        """Ranges sharing at least one section with first_section-last_section"""
+        hi = bisect.bisect_right(self._firsts, last_section)
+        return self._report(0, hi, lambda node: self._max_last[node] < first_section, lambda last: last >= first_section)
+
+    def stabbing(self, section: int) -> List[Tuple[int, int]]:
+        """Ranges including the given section"""
+        return self.overlapping(section, section)
+
+    def containing(self, first_section: int, last_section: int) -> List[Tuple[int, int]]:
+        """Ranges fully containing first_section-last_section"""
+        hi = bisect.bisect_right(self._firsts, first_section)
+        return self._report(0, hi, lambda node: self._max_last[node] < last_section, lambda last: last >= last_section)
+
+    def contained_in(self, first_section: int, last_section: int) -> List[Tuple[int, int]]:
+        """Ranges lying fully within first_section-last_section"""
+        lo = bisect.bisect_left(self._firsts, first_section)
+        hi = bisect.bisect_right(self._firsts, last_section)
+        return self._report(lo, hi, lambda node: self._min_last[node] > last_section, lambda last: last <= last_section)
+
+    def fully_contained_ranges(self) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """Every (container, contained) pair of distinct ranges across the whole roster"""
+        return [
+            (container, contained)
+            for first, last, container in zip(self._firsts, self._lasts, self._ids)
+            for contained in self.contained_in(first, last)
+            if contained != container
+        ]
+
+def count_wasted_elf_assignments(lines: Iterable[str]) -> Tuple[int, int]:
+    """Parse each line once and count both predicates in a single pass with O(1) memory
+
+    Returns (assignments with a fully wasted elf, assignments with a partially wasted elf).
+    """
+    num_fully_wasted = 0
+    num_partially_wasted = 0
+    for line in lines:
+        line = line.strip()
+        if line == '':
+            continue
+        elf_0, elf_1 = line.split(',')
+        assignment = (assignment_tuple(elf_0), assignment_tuple(elf_1))
+        if assignment_contains_fully_wasted_elf(assignment):
+            num_fully_wasted += 1
+        if assignment_contains_partially_wasted_elf(assignment):
+            num_partially_wasted += 1
+    return num_fully_wasted, num_partially_wasted
+
 def main():
-    elf_assignments = elf_assignments_from_file(os.environ['ELF_ASSIGNMENTS_FILE'])
+    filepath = os.environ['ELF_ASSIGNMENTS_FILE']
 
-    # part 1
-    fully_wasted_elves = elf_assignments_with_fully_wasted_elf(elf_assignments)
-    num_fully_wasted_elves = count_assignments(fully_wasted_elves)
+    # part 1 and part 2 in one pass; '-' reads assignments from stdin
+    if filepath == '-':
+        num_fully_wasted_elves, num_partially_wasted_elves = count_wasted_elf_assignments(sys.stdin)
+    else:
+        p = pathlib.Path(filepath)
+        assert p.exists(), f"Elf assignments file not found: {p}"
+        with open(p, 'r') as f:
+            num_fully_wasted_elves, num_partially_wasted_elves = count_wasted_elf_assignments(f)
     print(f"{num_fully_wasted_elves} elves available for reassignment")
-
-    # part 2
-    partially_wasted_elves = elf_assignments_with_partially_wasted_elf(elf_assignments)
-    num_partially_wasted_elves = count_assignments(partially_wasted_elves)
     print(f"{num_partially_wasted_elves} elves could be put to better use")
 
 if __name__ == '__main__':
@@ -1,6 +1,9 @@
-from typing import Tuple, Iterable, List
-import copy
+from typing import Tuple, Iterable, Iterator, List, Dict, Optional
+import array
+import math
+import random
 import os
+import time
 import pathlib
 
 def get_lines_from_text(text: str) -> Iterable[str]:
@@ -41,39 +44,70 @@ def get_initial_stacks_from_config_lines(config_lines: Iterable[str], indices: I
                     stacks[j].append(char)
     return stacks
 
-def move_item_from_stack_to_stack(stacks: List[List[str]], from_stack: int, to_stack: int, k: int = 1, multi_crate_mover: bool = False) -> List[List[str]]:
-    stacks_ = copy.deepcopy(stacks)
-    temp_storage = list()
-    from_stack_ = from_stack - 1
-    to_stack_ = to_stack - 1
-    for _ in range(k):
-        temp_storage.append(stacks_[from_stack_].pop())
+def snapshot_stacks(stacks: List[List[str]]) -> List[List[str]]:
+    """Independent copy of stacks; crates are immutable strings, so copying each stack list is enough"""
+    return [list(stack) for stack in stacks]
+
+def move_item_from_stack_to_stack(stacks: List[List[str]], from_stack: int, to_stack: int, k: int = 1, multi_crate_mover: bool = False, in_place: bool = False) -> List[List[str]]:
+    stacks_ = stacks if in_place else snapshot_stacks(stacks)
+    from_stack_ = stacks_[from_stack - 1]
+    to_stack_ = stacks_[to_stack - 1]
+    if k > len(from_stack_):
+        raise IndexError(f"Cannot move {k} crates from stack {from_stack} holding {len(from_stack_)}")
+    if k <= 0:
+        return stacks_
+    moved = from_stack_[-k:]
+    del from_stack_[-k:]
     if not multi_crate_mover:
-        stacks_[to_stack_].extend(temp_storage)
-    else:
-        for _ in range(k):
-            stacks_[to_stack_].append(temp_storage.pop())
+        moved.reverse()
+    to_stack_.extend(moved)
     return stacks_
 
-def execute_rearrangement(stacks: List[List[str]], rearrangement_str: str, multi_crate_mover: bool = False) -> List[List[str]]:
+def parse_rearrangement(rearrangement_str: str) -> Tuple[int, int, int]:
+    """Parse "move k from a to b" into (k, a, b)"""
     command = rearrangement_str.split(' ')
     assert len(command) == 6 and command[0] == 'move' and command[2] == 'from' and command[4] == 'to', \
         f"Instruction not understood, got: {rearrangement_str}"
-    k = int(command[1])
-    from_stack = int(command[3])
-    to_stack = int(command[5])
-    return move_item_from_stack_to_stack(stacks=stacks, from_stack=from_stack, to_stack=to_stack, k=k, multi_crate_mover=multi_crate_mover)
+    return int(command[1]), int(command[3]), int(command[5])
+
+def compile_rearrangement_procedure(rearrangement_procedure: Iterable[str]) -> array.array:
+    """Parse a procedure once into a flat integer array of (k, from_stack, to_stack) triples"""
+    compiled = array.array('l')
+    for proc in rearrangement_procedure:
+        compiled.extend(parse_rearrangement(proc))
+    return compiled
 
-def execute_rearrangement_procedure(stacks: List[List[str]], rearrangement_procedure: Iterable[str], multi_crate_mover: bool = False) -> List[List[str]]:
-    new_stacks = stacks
+def iter_compiled_rearrangements(compiled_procedure: array.array) -> Iterable[Tuple[int, int, int]]:
+    it = iter(compiled_procedure)
+    return zip(it, it, it)
+
+def execute_rearrangement(stacks: List[List[str]], rearrangement_str: str, multi_crate_mover: bool = False, in_place: bool = False) -> List[List[str]]:
+    k, from_stack, to_stack = parse_rearrangement(rearrangement_str)
+    return move_item_from_stack_to_stack(stacks=stacks, from_stack=from_stack, to_stack=to_stack, k=k, multi_crate_mover=multi_crate_mover, in_place=in_place)
+
+def execute_rearrangement_procedure(stacks: List[List[str]], rearrangement_procedure: Iterable[str], multi_crate_mover: bool = False, in_place: bool = False) -> List[List[str]]:
+    """Run a procedure; unless in_place, stacks are snapshotted once up front and left untouched"""
+    new_stacks = stacks if in_place else snapshot_stacks(stacks)
     for proc in rearrangement_procedure:
-        new_stacks = execute_rearrangement(new_stacks, proc, multi_crate_mover)
+        execute_rearrangement(new_stacks, proc, multi_crate_mover, in_place=True)
+    return new_stacks
+
+def execute_compiled_rearrangement_procedure(stacks: List[List[str]], compiled_procedure: array.array, multi_crate_mover: bool = False, in_place: bool = False) -> List[List[str]]:
+    """As execute_rearrangement_procedure, for a procedure from compile_rearrangement_procedure"""
+    new_stacks = stacks if in_place else snapshot_stacks(stacks)
+    for k, from_stack, to_stack in iter_compiled_rearrangements(compiled_procedure):
+        move_item_from_stack_to_stack(new_stacks, from_stack, to_stack, k=k, multi_crate_mover=multi_crate_mover, in_place=True)
     return new_stacks
 
+def get_initial_stacks_and_compiled_procedure_from_lines(lines: Iterable[str]) -> Tuple[List[List[str]], array.array]:
+    initial_configuration_lines, instruction_lines, indices = get_initial_configuration_and_instructions_from_lines(lines)
+    initial_stacks = get_initial_stacks_from_config_lines(initial_configuration_lines, indices)
+    return initial_stacks, compile_rearrangement_procedure(instruction_lines)
+
 def get_rearranged_stacks_from_lines(lines: Iterable[str], multi_crate_mover: bool = False) -> List[List[str]]:
     initial_configuration_lines, instruction_lines, indices = get_initial_configuration_and_instructions_from_lines(lines)
     initial_stacks = get_initial_stacks_from_config_lines(initial_configuration_lines, indices)
-    final_stacks = execute_rearrangement_procedure(initial_stacks, instruction_lines, multi_crate_mover)
+    final_stacks = execute_rearrangement_procedure(initial_stacks, instruction_lines, multi_crate_mover, in_place=True)
     return final_stacks
 
 def get_top_crate_from_each_stack(stacks: List[List[str]]) -> str:
@@ -82,19 +116,302 @@ def get_top_crate_from_each_stack(stacks: List[List[str]]) -> str:
         top_crates.append(stack[-1])
     return ''.join(top_crates)
 
+def get_top_crate_from_each_stack_by_tracing(initial_stacks: List[List[str]], compiled_procedure: array.array, multi_crate_mover: bool = False) -> str:
+    """Top crates after a compiled procedure, without moving any crates
+
+    Only stack heights are simulated forwards. Each final top position is then traced backwards through
+    the procedure to its position in the initial stacks, in O(instructions x stacks) regardless of heights.
+    """
+    heights = [len(stack) for stack in initial_stacks]
+    for k, from_stack, to_stack in iter_compiled_rearrangements(compiled_procedure):
+        if k > heights[from_stack - 1]:
+            raise IndexError(f"Cannot move {k} crates from stack {from_stack} holding {heights[from_stack - 1]}")
+        heights[from_stack - 1] -= k
+        heights[to_stack - 1] += k
+    for i, height in enumerate(heights):
+        if height == 0:
+            raise IndexError(f"No top crate on empty stack {i + 1}")
+
+    # (stack index, position from bottom) of each final top crate, traced back one instruction at a time
+    positions = [(i, height - 1) for i, height in enumerate(heights)]
+    for i in range(len(compiled_procedure) - 3, -1, -3):
+        k = compiled_procedure[i]
+        from_stack_ = compiled_procedure[i + 1] - 1
+        to_stack_ = compiled_procedure[i + 2] - 1
+        # heights before this instruction
+        heights[from_stack_] += k
+        heights[to_stack_] -= k
+        # moved crates landed on top of what to_stack held once they were lifted off
+        landing_height = heights[to_stack_] - k if from_stack_ == to_stack_ else heights[to_stack_]
+        for j, (stack, position) in enumerate(positions):
+            if stack == to_stack_ and position >= landing_height:
+                offset = position - landing_height
+                if multi_crate_mover:
+                    positions[j] = (from_stack_, heights[from_stack_] - k + offset)
+                else:
+                    positions[j] = (from_stack_, heights[from_stack_] - 1 - offset)
+    return ''.join(initial_stacks[stack][position] for stack, position in positions)
+
+class _RopeNode:
+    __slots__ = ('crate', 'priority', 'size', 'left', 'right', 'reversed')
+
+    def __init__(self, crate: str, priority: float):
+        self.crate = crate
+        self.priority = priority
+        self.size = 1
+        self.left: Optional[_RopeNode] = None
+        self.right: Optional[_RopeNode] = None
+        self.reversed = False
+
+def _rope_size(node: Optional[_RopeNode]) -> int:
+    return node.size if node is not None else 0
+
+def _rope_push(node: _RopeNode) -> None:
+    """Apply a pending reversal to node's children"""
+    if node.reversed:
+        node.left, node.right = node.right, node.left
+        for child in (node.left, node.right):
+            if child is not None:
+                child.reversed = not child.reversed
+        node.reversed = False
+
+def _rope_update(node: _RopeNode) -> None:
+    node.size = 1 + _rope_size(node.left) + _rope_size(node.right)
+
+def _rope_split(node: Optional[_RopeNode], k: int) -> Tuple[Optional[_RopeNode], Optional[_RopeNode]]:
+    """Split into (first k crates, the rest)"""
+    if node is None:
+        return None, None
+    _rope_push(node)
+    if _rope_size(node.left) >= k:
+        first, rest = _rope_split(node.left, k)
+        node.left = rest
+        _rope_update(node)
+        return first, node
+    first, rest = _rope_split(node.right, k - _rope_size(node.left) - 1)
+    node.right = first
+    _rope_update(node)
+    return node, rest
+
+def _rope_merge(first: Optional[_RopeNode], rest: Optional[_RopeNode]) -> Optional[_RopeNode]:
+    if first is None:
+        return rest
+    if rest is None:
+        return first
+    if first.priority > rest.priority:
+        _rope_push(first)
+        first.right = _rope_merge(first.right, rest)
+        _rope_update(first)
+        return first
+    _rope_push(rest)
+    rest.left = _rope_merge(first, rest.left)
+    _rope_update(rest)
+    return rest
+
+def _rope_from_crates(crates: Iterable[str]) -> Optional[_RopeNode]:
+    """Build a treap in O(n), as a Cartesian tree over random priorities"""
+    spine: List[_RopeNode] = []
+    for crate in crates:
+        node = _RopeNode(crate, random.random())
+        last = None
+        while spine and spine[-1].priority < node.priority:
+            last = spine.pop()
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+    if not spine:
+        return None
+    root = spine[0]
+    # sizes, bottom-up
+    order = [root]
+    for node in order:
+        order.extend(child for child in (node.left, node.right) if child is not None)
+    for node in reversed(order):
+        _rope_update(node)
+    return root
+
+class RopeStack:
+    """Stack of crates held as a rope: an implicit-key treap with a lazy reverse flag
+
+    Taking the top k crates is one split and placing them is one merge, each O(log n) expected however
+    large k is and however fragmented earlier moves have left the stack. The single-crate mover's
+    reversal just toggles the flag on the moved rope.
+    """
+
+    __slots__ = ('_root',)
+
+    def __init__(self, crates: Iterable[str] = ()):
+        self._root = _rope_from_crates(crates)
+
+    def __len__(self) -> int:
+        return _rope_size(self._root)
+
+    def __iter__(self) -> Iterator[str]:
+        """Crates from bottom to top"""
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                _rope_push(node)
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.crate
+            node = node.right
+
+    def to_list(self) -> List[str]:
+        return list(self)
+
+    def top(self) -> str:
+        node = self._root
+        if node is None:
+            raise IndexError(f"No top crate on empty stack")
+        while True:
+            _rope_push(node)
+            if node.right is None:
+                return node.crate
+            node = node.right
+
+    def take(self, k: int) -> Optional[_RopeNode]:
+        """Remove the top k crates, returned as a rope to hand to put"""
+        if k > len(self):
+            raise IndexError(f"Cannot move {k} crates from stack holding {len(self)}")
+        self._root, taken = _rope_split(self._root, len(self) - k)
+        return taken
+
+    def put(self, rope: Optional[_RopeNode], reverse: bool = False) -> None:
+        """Place a rope from take on top of the stack, optionally flipping it"""
+        if reverse and rope is not None:
+            rope.reversed = not rope.reversed
+        self._root = _rope_merge(self._root, rope)
+
+def rope_stacks_from_stacks(stacks: List[List[str]]) -> List[RopeStack]:
+    return [RopeStack(stack) for stack in stacks]
+
+def execute_compiled_rearrangement_procedure_on_rope_stacks(rope_stacks: List[RopeStack], compiled_procedure: array.array, multi_crate_mover: bool = False) -> List[RopeStack]:
+    """As execute_compiled_rearrangement_procedure with in_place=True, on RopeStacks"""
+    for k, from_stack, to_stack in iter_compiled_rearrangements(compiled_procedure):
+        moved = rope_stacks[from_stack - 1].take(k)
+        rope_stacks[to_stack - 1].put(moved, reverse=not multi_crate_mover)
+    return rope_stacks
+
+def fragmenting_benchmark_case(num_crates: int = 20000, num_block_moves: int = 400) -> Tuple[List[List[str]], array.array]:
+    """Two stacks; num_crates single-crate moves shuffle every crate across, then whole-stack moves go back and forth
+
+    The single moves leave any block-based representation maximally fragmented before the large moves.
+    """
+    initial_stacks = [[chr(ord('A') + i % 26) for i in range(num_crates)], []]
+    procedure = [(1, 1, 2)] * num_crates + [(num_crates, 2, 1), (num_crates, 1, 2)] * (num_block_moves // 2)
+    compiled = array.array('l')
+    for triple in procedure:
+        compiled.extend(triple)
+    return initial_stacks, compiled
+
+def benchmark_stack_representations(initial_stacks: List[List[str]], compiled_procedure: array.array, multi_crate_mover: bool = False) -> Dict[str, float]:
+    """Seconds taken to run the same compiled procedure on list-backed and rope-backed stacks
+
+    See fragmenting_benchmark_case for an input mixing many small moves with large block moves.
+    """
+    timings = dict()
+    list_stacks = snapshot_stacks(initial_stacks)
+    start = time.perf_counter()
+    execute_compiled_rearrangement_procedure(list_stacks, compiled_procedure, multi_crate_mover, in_place=True)
+    timings['list'] = time.perf_counter() - start
+    rope_stacks = rope_stacks_from_stacks(initial_stacks)
+    start = time.perf_counter()
+    execute_compiled_rearrangement_procedure_on_rope_stacks(rope_stacks, compiled_procedure, multi_crate_mover)
+    timings['rope'] = time.perf_counter() - start
+    assert [stack.to_list() for stack in rope_stacks] == list_stacks, f"Stack representations disagree"
+    return timings
+
+class CheckpointedRearrangement:
+    """Runs a compiled procedure once, keeping a compact checkpoint of the stacks every checkpoint_interval steps
+
+    stacks_after(step) restores the nearest earlier checkpoint and replays at most checkpoint_interval - 1
+    instructions. Checkpoints store each stack as a string of its crates, so every crate must be a
+    single character (as get_initial_stacks_from_config_lines produces); this is asserted up front.
+    If only memory_budget (in crates stored across all checkpoints) is given, the interval is chosen
+    to fit it; if both are given, an interval whose checkpoints would exceed the budget raises ValueError,
+    as does a budget too small for even the initial checkpoint.
+    """
+
+    def __init__(
+            self,
+            initial_stacks: List[List[str]],
+            compiled_procedure: array.array,
+            multi_crate_mover: bool = False,
+            checkpoint_interval: Optional[int] = None,
+            memory_budget: Optional[int] = None
+        ):
+        self._compiled_procedure = compiled_procedure
+        self._multi_crate_mover = multi_crate_mover
+        self._num_steps = len(compiled_procedure) // 3
+        assert all(len(crate) == 1 for stack in initial_stacks for crate in stack), \
+            f"Checkpoints require single-character crates"
+        total_crates = sum(len(stack) for stack in initial_stacks)
+        if memory_budget is not None and memory_budget < total_crates:
+            raise ValueError(f"Memory budget of {memory_budget} crates cannot hold one checkpoint of {total_crates} crates")
+        if checkpoint_interval is None:
+            if memory_budget is None:
+                checkpoint_interval = 1000
+            else:
+                max_checkpoints = max(1, memory_budget // max(1, total_crates))
+                checkpoint_interval = math.ceil((self._num_steps + 1) / max_checkpoints)
+        assert checkpoint_interval > 0, f"Expected positive checkpoint interval, got {checkpoint_interval}"
+        if memory_budget is not None:
+            checkpoint_crates = (self._num_steps // checkpoint_interval + 1) * total_crates
+            if checkpoint_crates > memory_budget:
+                raise ValueError(
+                    f"Checkpoint interval {checkpoint_interval} needs {checkpoint_crates} crates of checkpoints, "
+                    f"over the memory budget of {memory_budget}"
+                )
+        self.checkpoint_interval = checkpoint_interval
+
+        self._checkpoints: List[Tuple[str, ...]] = []
+        stacks = snapshot_stacks(initial_stacks)
+        for step, (k, from_stack, to_stack) in enumerate(iter_compiled_rearrangements(compiled_procedure)):
+            if step % checkpoint_interval == 0:
+                self._checkpoints.append(self._checkpoint(stacks))
+            move_item_from_stack_to_stack(stacks, from_stack, to_stack, k=k, multi_crate_mover=multi_crate_mover, in_place=True)
+        if self._num_steps % checkpoint_interval == 0:
+            self._checkpoints.append(self._checkpoint(stacks))
+        self.final_stacks = stacks
+
+    @staticmethod
+    def _checkpoint(stacks: List[List[str]]) -> Tuple[str, ...]:
+        return tuple(''.join(stack) for stack in stacks)
+
+    def __len__(self) -> int:
+        """Number of instructions in the procedure"""
+        return self._num_steps
+
+    def stacks_after(self, step: int) -> List[List[str]]:
+        """Stacks after the first `step` instructions (step 0 is the initial configuration)"""
+        if not 0 <= step <= self._num_steps:
+            raise IndexError(f"Step must be between 0 and {self._num_steps}, got {step}")
+        checkpoint_index = step // self.checkpoint_interval
+        stacks = [list(stack) for stack in self._checkpoints[checkpoint_index]]
+        replay_from = checkpoint_index * self.checkpoint_interval
+        return execute_compiled_rearrangement_procedure(
+            stacks, self._compiled_procedure[3 * replay_from:3 * step], self._multi_crate_mover, in_place=True
+        )
+
 def main():
     filepath = os.environ['CRATE_MANIFEST_FILE']
     assert pathlib.Path(filepath).exists(), f"Expected file to exist: {filepath}"
     with open(filepath, 'r') as f:
         lines = [line.rstrip() for line in f.readlines()]
 
+    initial_stacks, compiled_procedure = get_initial_stacks_and_compiled_procedure_from_lines(lines)
+
     # part 1 - without multi-crate mover
-    stacks = get_rearranged_stacks_from_lines(lines)
+    stacks = execute_compiled_rearrangement_procedure(initial_stacks, compiled_procedure)
     top_crates = get_top_crate_from_each_stack(stacks)
     print(f"Top crates: {top_crates}")
 
     # part 2 - with multi crate mover
-    stacks_multi = get_rearranged_stacks_from_lines(lines, multi_crate_mover=True)
+    stacks_multi = execute_compiled_rearrangement_procedure(initial_stacks, compiled_procedure, multi_crate_mover=True, in_place=True)
     top_crates_multi = get_top_crate_from_each_stack(stacks_multi)
     print(f"Top crates (using multi-crate mover): {top_crates_multi}")
 
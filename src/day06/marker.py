@@ -1,6 +1,9 @@
-from typing import Union, TypeVar, Callable
+from typing import Union, TypeVar, Callable, BinaryIO, Iterable, Iterator, Tuple, Dict, List, Optional
+import concurrent.futures
+import mmap
 import pathlib
 import os
+import time
 
 PathT = TypeVar('PathT', bound=pathlib.Path)
 
@@ -15,8 +18,214 @@ def make_marker_finder(num_distinct_characters: int) -> Callable[[str], int]:
                 return i+num_distinct_characters
     return finder
 
-find_first_marker = make_marker_finder(4)
-find_first_start_of_message_marker = make_marker_finder(14)
+def make_sliding_marker_finder(num_distinct_characters: int) -> Callable[[str], int]:
+    """Drop-in for make_marker_finder, in O(n) with no per-position allocation
+
+    Tracks where each character was last seen; on a repeat inside the window, the window start jumps
+    straight past the earlier occurrence.
+    """
+    def finder(s: str) -> int:
+        last_seen = dict()
+        window_start = 0
+        for i, c in enumerate(s):
+            previous = last_seen.get(c, -1)
+            if previous >= window_start:
+                window_start = previous + 1
+            last_seen[c] = i
+            if i - window_start + 1 == num_distinct_characters:
+                return i+1
+        return -1
+    return finder
+
+def make_bitset_marker_finder(num_distinct_characters: int, block_size: int = 1 << 20) -> Callable[[Union[str, bytes]], int]:
+    """Alternative engine for make_marker_finder, checking every offset of a block at once with big-int bitsets
+
+    Each block of the signal becomes one integer with a byte per position. For each lag d < width, XOR
+    against itself shifted by d bytes and a SWAR zero-byte test flag every position equal to the byte d
+    earlier. A flag at lag d rules out every window of the width that covers both bytes, which is an OR over
+    shifted copies of the flags (built by doubling). The first position left unflagged ends the first marker.
+    Characters must be single bytes (latin-1).
+    """
+    width = num_distinct_characters
+
+    def first_marker_in_block(block: bytes) -> int:
+        n = len(block)
+        if n < width:
+            return -1
+        ones = int.from_bytes(b'\x01' * n, 'little')
+        low_bits = ones * 0x7F
+        high_bits = ones * 0x80
+        x = int.from_bytes(block, 'little')
+        bad = 0
+        for lag in range(1, width):
+            diff = x ^ (x << (8 * lag))
+            nonzero = ((diff & low_bits) + low_bits | diff) & high_bits
+            equal = (high_bits ^ nonzero) >> 7
+            equal &= ~((1 << (8 * lag)) - 1)
+            # spread each flag forward over the width - lag windows that contain both equal bytes
+            span_length = width - lag
+            span = 1
+            while span * 2 <= span_length:
+                equal |= equal << (8 * span)
+                span *= 2
+            if span < span_length:
+                equal |= equal << (8 * (span_length - span))
+            bad |= equal
+        good = (ones ^ (bad & ones)) >> (8 * (width - 1)) << (8 * (width - 1))
+        if good == 0:
+            return -1
+        return ((good & -good).bit_length() - 1) // 8 + 1
+
+    def finder(s: Union[str, bytes]) -> int:
+        data = s.encode('latin-1') if isinstance(s, str) else s
+        for start in range(0, max(len(data) - width + 1, 0), block_size):
+            marker = first_marker_in_block(data[start:start + block_size + width - 1])
+            if marker != -1:
+                return start + marker
+        return -1
+    return finder
+
+find_first_marker = make_sliding_marker_finder(4)
+find_first_start_of_message_marker = make_sliding_marker_finder(14)
+
+def iter_all_markers(signal: Union[str, bytes], widths: Iterable[int]) -> Iterator[Tuple[int, int]]:
+    """Yield every (width, marker position) for several window widths in one pass over the signal
+
+    A single last-seen table gives the length of the longest all-distinct run ending at each position;
+    a marker of width w ends at every position where that run is at least w long.
+    """
+    widths = sorted(set(widths))
+    last_seen = dict()
+    window_start = 0
+    for i, c in enumerate(signal):
+        previous = last_seen.get(c, -1)
+        if previous >= window_start:
+            window_start = previous + 1
+        last_seen[c] = i
+        run = i - window_start + 1
+        for width in widths:
+            if width > run:
+                break
+            yield width, i+1
+
+def find_first_markers(signal: Union[str, bytes], widths: Iterable[int]) -> Dict[int, int]:
+    """First marker position for each width (-1 if none), stopping as soon as all are found"""
+    widths = set(widths)
+    first_markers = dict.fromkeys(widths, -1)
+    remaining = set(widths)
+    for width, position in iter_all_markers(signal, widths):
+        if width in remaining:
+            first_markers[width] = position
+            remaining.discard(width)
+            if not remaining:
+                break
+    return first_markers
+
+class StreamingMarkerFinder:
+    """Sliding-window marker search over a signal fed in byte chunks of any size
+
+    Window state (last position of each byte value, window start, bytes consumed) carries over between
+    chunks, so only the current chunk is ever held in memory.
+    """
+
+    def __init__(self, num_distinct_characters: int):
+        self.num_distinct_characters = num_distinct_characters
+        self._last_seen = [-1] * 256
+        self._window_start = 0
+        self._position = 0
+        self.marker = -1
+
+    def feed(self, chunk: bytes) -> int:
+        """Consume the next chunk; return the marker position once found (and thereafter), else -1"""
+        if self.marker != -1:
+            return self.marker
+        last_seen = self._last_seen
+        window_start = self._window_start
+        for i, byte in enumerate(chunk, start=self._position):
+            if last_seen[byte] >= window_start:
+                window_start = last_seen[byte] + 1
+            last_seen[byte] = i
+            if i - window_start + 1 == self.num_distinct_characters:
+                self.marker = i+1
+                break
+        self._window_start = window_start
+        self._position += len(chunk)
+        return self.marker
+
+def find_marker_in_stream(stream: BinaryIO, num_distinct_characters: int, chunk_size: int = 1 << 16) -> int:
+    """Read a binary file object (or socket-like object with recv) in chunks until the marker is found"""
+    read = stream.read if hasattr(stream, 'read') else stream.recv
+    finder = StreamingMarkerFinder(num_distinct_characters)
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return -1
+        marker = finder.feed(chunk)
+        if marker != -1:
+            return marker
+
+async def find_marker_in_async_stream(stream, num_distinct_characters: int, chunk_size: int = 1 << 16) -> int:
+    """As find_marker_in_stream, for an async reader such as asyncio.StreamReader"""
+    finder = StreamingMarkerFinder(num_distinct_characters)
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            return -1
+        marker = finder.feed(chunk)
+        if marker != -1:
+            return marker
+
+def find_marker_in_shard(filepath: Union[PathT, str], start: int, end: int, num_distinct_characters: int, chunk_size: int = 1 << 20) -> int:
+    """First marker whose window starts in [start, end) of a memory-mapped file, as an absolute position, else -1
+
+    The shard is read up to num_distinct_characters - 1 bytes past its end so windows straddling the boundary are seen.
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        stop = min(end + num_distinct_characters - 1, len(mm))
+        finder = StreamingMarkerFinder(num_distinct_characters)
+        for chunk_start in range(start, stop, chunk_size):
+            marker = finder.feed(mm[chunk_start:min(chunk_start + chunk_size, stop)])
+            if marker != -1:
+                return start + marker
+    return -1
+
+def shard_ranges(size: int, num_shards: int) -> List[Tuple[int, int]]:
+    """Split [0, size) into up to num_shards contiguous (start, end) ranges"""
+    boundaries = sorted(set(i * size // num_shards for i in range(num_shards + 1)))
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def find_marker_in_file_parallel(filepath: Union[PathT, str], num_distinct_characters: int, processes: Optional[int] = None) -> int:
+    """As make_marker_finder(num_distinct_characters) on the file contents, searching overlapping shards in a process pool"""
+    p = pathlib.Path(filepath)
+    assert p.exists(), f"Expected file to exist: {filepath}"
+    size = p.stat().st_size
+    if size == 0:
+        return -1
+    processes = processes or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(find_marker_in_shard, str(p), start, end, num_distinct_characters)
+            for start, end in shard_ranges(size, processes)
+        ]
+        # shards are in file order, so the first shard with a marker holds the earliest one
+        for future in futures:
+            marker = future.result()
+            if marker != -1:
+                for pending in futures:
+                    pending.cancel()
+                return marker
+    return -1
+
+def benchmark_find_marker_in_file_parallel(filepath: Union[PathT, str], num_distinct_characters: int, process_counts: Iterable[int] = (1, 2, 4, 8)) -> Dict[int, float]:
+    """Throughput (bytes per second) of find_marker_in_file_parallel on a file, for each process count"""
+    size = pathlib.Path(filepath).stat().st_size
+    throughput = dict()
+    for processes in process_counts:
+        start = time.perf_counter()
+        find_marker_in_file_parallel(filepath, num_distinct_characters, processes=processes)
+        elapsed = time.perf_counter() - start
+        throughput[processes] = size / elapsed
+    return throughput
 
 def get_signal_from_file(filepath: Union[PathT, str]) -> str:
     p = pathlib.Path(filepath)
@@ -29,12 +238,15 @@ def main():
     signal_file = os.environ['SIGNAL_FILE']
     signal = get_signal_from_file(signal_file)
 
+    # both parts in a single pass over the signal
+    first_markers = find_first_markers(signal, (4, 14))
+
     # part 1 - find first marker position
-    first_marker_position = find_first_marker(signal)
+    first_marker_position = first_markers[4]
     print(f"First marker found after position {first_marker_position}")
 
     # part 2 - find first start of message position
-    first_start_of_message_position = find_first_start_of_message_marker(signal)
+    first_start_of_message_position = first_markers[14]
     print(f"First start-of-message marker found after position {first_start_of_message_position}")
 
 if __name__ == '__main__':
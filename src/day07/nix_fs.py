@@ -1,17 +1,24 @@
 from __future__ import annotations
-from typing import TypeVar, Optional, Iterable, Dict
+from typing import TypeVar, Optional, Iterable, Iterator, Dict, List, Tuple
+import array
 import os
+import sys
+import time
 import pathlib
 import logging
 
 FSDirT = TypeVar('FSDirT', bound='FSDir')
 
+# debug messages are %-style so they are only formatted when DEBUG is enabled; main() replaces this logger
+logger = logging.getLogger(__name__)
+
 class FSDir:
     """Filesystem Directory"""
 
-    # variables held by the FSDir at the root of the system, to give us UUIDs on tap
-    _max_uuid: int = -1
-    _registry: Dict[int, FSDirT] = dict()
+    # variables held by the FSDir at the root of the system, to give us UUIDs on tap;
+    # each root owns its own, so a tree's registry is released along with the tree
+    _max_uuid: int
+    _registry: Dict[int, FSDirT]
 
     @property
     def root(self) -> FSDirT:
@@ -23,7 +30,7 @@ class FSDir:
         if self.root == self:
             self._max_uuid += 1
             self._registry[self._max_uuid] = fsdir
-            logger.debug(f"FSDir.register: UUID={self.root._max_uuid}, fsdir={fsdir!r}, root={self.root!r}")
+            logger.debug("FSDir.register: UUID=%s, fsdir=%r, root=%r", self.root._max_uuid, fsdir, self.root)
             return
         else:
             return self.root.register(fsdir)
@@ -35,19 +42,41 @@ class FSDir:
 
     @property
     def size(self) -> int:
+        """Total size of this directory and everything below it
+
+        Sizes are aggregated in a single post-order pass over any subtree whose cached size is missing,
+        caching every directory on the way, so sizing all directories of a tree is O(n) overall.
+        """
         global logger
-        size_ = self._size
-        logger.debug(f"FSDir.size: FSDir={self!r}, own size={size_}")
-        for subdir in self._subdirs.values():
-            subdir_size = subdir.size
-            size_ += subdir_size
-            logger.debug(f"FSDir.size: FSDir={self!r}, subdir={subdir!r}, subdir_size={subdir_size}, new size={size_}")
-        return size_
+        if self._total_size is not None:
+            return self._total_size
+        stack = [(self, False)]
+        while stack:
+            fsdir, children_done = stack.pop()
+            if fsdir._total_size is not None:
+                continue
+            if not children_done:
+                stack.append((fsdir, True))
+                stack.extend((subdir, False) for subdir in fsdir._subdirs.values() if subdir._total_size is None)
+                continue
+            size_ = fsdir._size + sum(subdir._total_size for subdir in fsdir._subdirs.values())
+            fsdir._total_size = size_
+            logger.debug("FSDir.size: FSDir=%r, own size=%s, total size=%s", fsdir, fsdir._size, size_)
+        return self._total_size
+
+    def invalidate_size(self) -> None:
+        """Drop cached total sizes for this directory and its ancestors"""
+        fsdir = self
+        while fsdir is not None and fsdir._total_size is not None:
+            fsdir._total_size = None
+            fsdir = fsdir._parent
 
     def __init__(self, name: str, parent: Optional[FSDirT] = None):
         global logger
         if not parent:
             self._root = self
+            self._max_uuid = -1
+            self._registry = dict()
         else:
             self._root = parent.root
         self._name = name
@@ -56,25 +85,28 @@ class FSDir:
         self._files = set()
         self.register(self)
         self._size = 0
-        logger.debug(f"FSDir.__init__: name={name}, parent={parent!r}, root={self._root}")
+        self._total_size: Optional[int] = None
+        logger.debug("FSDir.__init__: name=%s, parent=%r, root=%s", name, parent, self._root)
 
     def add_subdir(self, subdir_name: str) -> None:
         """Add a subdirectory"""
         global logger
-        logger.debug(f"FSDir.add_subdir: subdir_name={subdir_name}")
+        logger.debug("FSDir.add_subdir: subdir_name=%s", subdir_name)
         self._subdirs[subdir_name] = FSDir(name=subdir_name, parent=self)
+        self.invalidate_size()
 
     def add_file(self, filename: str, size: int) -> None:
         """Add a file to the current directory"""
         global logger
         self._files.add(filename)
         self._size += size
-        logger.debug(f"FSDir.add_file: filename={filename}, size={size}")
+        self.invalidate_size()
+        logger.debug("FSDir.add_file: filename=%s, size=%s", filename, size)
 
     def cd(self, subdir_name: str) -> FSDirT:
         """Return a subdirectory"""
         global logger
-        logger.debug(f"FSDir.cd: subdir_name={subdir_name}")
+        logger.debug("FSDir.cd: subdir_name=%s", subdir_name)
         if subdir_name == '..':
             if self._parent is None:
                 raise ValueError(f"Attempt to grab parent of root")
@@ -83,46 +115,203 @@ class FSDir:
             raise FileNotFoundError(f"You haven't told me about this subdirectory yet: {subdir_name}")
         return self._subdirs[subdir_name]
 
+    @property
+    def name(self) -> str:
+        return self._name
+
     def __repr__(self):
         return f"FSDir({self._name})"
 
+class CompactFSTree:
+    """Array-backed filesystem tree for very large transcripts
+
+    Directories are integer indices (root is 0) into parallel arrays of parent, own file size, first child
+    and next sibling, plus an interned name id. Filenames are not kept, only their sizes. A child always
+    has a higher index than its parent, so total sizes come from one reverse sweep over the arrays.
+    Children are found by name through a single dict keyed by (parent index, name id) packed into one int,
+    so add_subdir and cd are O(1) however wide a directory gets. That index is the bulk of the footprint:
+    roughly 100 bytes per directory (dict slot plus boxed key and value) against about 40 for the five
+    arrays, so around 140 bytes per directory in all, versus roughly 580 for an FSDir tree.
+    """
+
+    __slots__ = ('_parent', '_own_size', '_first_child', '_next_sibling', '_name_id', '_names', '_name_ids', '_child_index', '_total_size')
+
+    def __init__(self):
+        self._parent = array.array('q', [-1])
+        self._own_size = array.array('q', [0])
+        self._first_child = array.array('q', [-1])
+        self._next_sibling = array.array('q', [-1])
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = dict()
+        self._name_id = array.array('q', [self._intern('/')])
+        self._child_index: Dict[int, int] = dict()
+        self._total_size: Optional[array.array] = None
+
+    @staticmethod
+    def _child_key(index: int, name_id: int) -> int:
+        """(parent index, name id) packed into one int, avoiding a tuple per directory"""
+        return (index << 32) | name_id
+
+    def _intern(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+
+    @property
+    def root(self) -> CompactFSDir:
+        return CompactFSDir(self, 0)
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def __iter__(self) -> Iterator[Tuple[int, CompactFSDir]]:
+        return ((index, CompactFSDir(self, index)) for index in range(len(self)))
+
+    def name(self, index: int) -> str:
+        return self._names[self._name_id[index]]
+
+    def children(self, index: int) -> Iterator[int]:
+        child = self._first_child[index]
+        while child != -1:
+            yield child
+            child = self._next_sibling[child]
+
+    def add_subdir(self, index: int, subdir_name: str) -> int:
+        """Add a subdirectory (or return the existing one of that name)"""
+        name_id = self._intern(subdir_name)
+        child = self._child_index.get(self._child_key(index, name_id))
+        if child is not None:
+            return child
+        child = len(self)
+        self._child_index[self._child_key(index, name_id)] = child
+        self._parent.append(index)
+        self._own_size.append(0)
+        self._first_child.append(-1)
+        self._next_sibling.append(self._first_child[index])
+        self._name_id.append(name_id)
+        self._first_child[index] = child
+        self._total_size = None
+        return child
+
+    def add_file(self, index: int, size: int) -> None:
+        self._own_size[index] += size
+        self._total_size = None
+
+    def cd(self, index: int, subdir_name: str) -> int:
+        if subdir_name == '..':
+            if index == 0:
+                raise ValueError(f"Attempt to grab parent of root")
+            return self._parent[index]
+        name_id = self._name_ids.get(subdir_name)
+        child = None if name_id is None else self._child_index.get(self._child_key(index, name_id))
+        if child is not None:
+            return child
+        raise FileNotFoundError(f"You haven't told me about this subdirectory yet: {subdir_name}")
+
+    def size(self, index: int) -> int:
+        if self._total_size is None:
+            total_size = array.array('q', self._own_size)
+            for child in range(len(self) - 1, 0, -1):
+                total_size[self._parent[child]] += total_size[child]
+            self._total_size = total_size
+        return self._total_size[index]
+
+class CompactFSDir:
+    """Lightweight handle on a directory in a CompactFSTree, with the FSDir query interface"""
+
+    __slots__ = ('_tree', '_index')
+
+    def __init__(self, tree: CompactFSTree, index: int):
+        self._tree = tree
+        self._index = index
+
+    @property
+    def root(self) -> CompactFSDir:
+        return self._tree.root
+
+    @property
+    def name(self) -> str:
+        return self._tree.name(self._index)
+
+    @property
+    def size(self) -> int:
+        return self._tree.size(self._index)
+
+    def __iter__(self) -> Iterator[Tuple[int, CompactFSDir]]:
+        return iter(self._tree)
+
+    def add_subdir(self, subdir_name: str) -> None:
+        self._tree.add_subdir(self._index, subdir_name)
+
+    def add_file(self, filename: str, size: int) -> None:
+        self._tree.add_file(self._index, size)
+
+    def cd(self, subdir_name: str) -> CompactFSDir:
+        return CompactFSDir(self._tree, self._tree.cd(self._index, subdir_name))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompactFSDir) and self._tree is other._tree and self._index == other._index
+
+    def __hash__(self) -> int:
+        return hash((id(self._tree), self._index))
+
+    def __repr__(self):
+        return f"CompactFSDir({self.name})"
+
 def split_lines(lines: str) -> Iterable[str]:
     return lines.split('\n')
 
-def get_FSDir_from_shell_transcript(lines: Iterable[str]) -> FSDirT:
-    """Parse a list of lines from a shell session, return an FSDir with all known file sizes"""
+def get_FSDir_from_shell_transcript(lines: Iterable[str], compact: bool = False) -> FSDirT:
+    """Parse a list of lines from a shell session, return an FSDir with all known file sizes
+
+    lines may be any iterable, including an open file or sys.stdin: the tree is built incrementally,
+    so memory is proportional to the tree rather than the transcript.
+
+    With compact=True, build a CompactFSTree instead and return a CompactFSDir handle on its root.
+    """
     global logger
-    root: FSDirT = FSDir(name='/', parent=None)
+    # checked once per parse, so per-line debug calls cost nothing above DEBUG
+    debug = logger.isEnabledFor(logging.DEBUG)
+    root: FSDirT = CompactFSTree().root if compact else FSDir(name='/', parent=None)
     cwd: Optional[FSDirT] = None
     for line in lines:
+        line = line.rstrip('\r\n')
         if line == '':
-            logger.debug('empty line - skipping')
+            if debug:
+                logger.debug('empty line - skipping')
             continue
         split_line = line.split(' ')
         first, *rest = split_line
         if first == '$': # command
-            logger.debug('branch: command')
+            if debug:
+                logger.debug('branch: command')
             second, *rest_ = rest
             if second == 'cd':
                 subdir_name = rest_[0]
-                logger.debug(f'branch: cd; subdir_name={subdir_name}')
+                if debug:
+                    logger.debug('branch: cd; subdir_name=%s', subdir_name)
                 if subdir_name == '/':
                     cwd = root
                 else:
                     cwd = cwd.cd(subdir_name)
             elif second == 'ls':
-                logger.debug('branch: ls')
+                if debug:
+                    logger.debug('branch: ls')
                 pass # no useful info
             else:
                 raise NotImplementedError
         elif first == 'dir': # info: name of a subdirectory
             subdir_name = rest[0]
-            logger.debug(f'branch: dir; subdir_name={subdir_name}')
+            if debug:
+                logger.debug('branch: dir; subdir_name=%s', subdir_name)
             cwd.add_subdir(subdir_name)
         else: # super-safe assumption: this is a file size
             size = int(first)
             filename = rest[0]
-            logger.debug(f'branch: default/file; size={size}, filename={filename}')
+            if debug:
+                logger.debug('branch: default/file; size=%s, filename=%s', size, filename)
             cwd.add_file(filename, size)
     return root
 
@@ -136,9 +325,9 @@ def size_of_filtered_dirs(dirs: Dict[str, int]) -> int:
         in_scope = size<=100000
         if in_scope:
             dirs_[uuid] = size
-        logger.debug(f"uuid={uuid}, fsd={fsd}, size={size} in_scope={in_scope}")
+        logger.debug("uuid=%s, fsd=%s, size=%s in_scope=%s", uuid, fsd, size, in_scope)
     size = sum(dirs_.values())
-    logger.debug(f"size={size}")
+    logger.debug("size=%s", size)
     return size
 
 def directory_to_sacrifice(
@@ -155,36 +344,58 @@ def directory_to_sacrifice(
     size_sacrifice_dir: Optional[int] = None
     dirs = list(root_fsdir)
     for uuid, fsd in dirs:
-        logger.debug(f"f: directory_to_sacrifice: uuid={uuid}, fsd={fsd!r}")
+        logger.debug("f: directory_to_sacrifice: uuid=%s, fsd=%r", uuid, fsd)
         this_fsd_size = fsd.size
         if this_fsd_size < additional_space_required:
-            logger.debug(f"f: directory_to_sacrifice: too small")
+            logger.debug("f: directory_to_sacrifice: too small")
             continue
         if size_sacrifice_dir is None or this_fsd_size < size_sacrifice_dir:
-            logger.debug(f"f: directory_to_sacrifice: new sacrifice dir identified: uuid={uuid}, fsd={fsd!r}")
+            logger.debug("f: directory_to_sacrifice: new sacrifice dir identified: uuid=%s, fsd=%r", uuid, fsd)
             size_sacrifice_dir = this_fsd_size
             sacrifice_dir = fsd
         else:
-            logger.debug(f"f: directory_to_sacrifice: default branch - do nothing")
+            logger.debug("f: directory_to_sacrifice: default branch - do nothing")
     if sacrifice_dir is None:
         raise RuntimeError(f"No directory available which can meet space requirements")
     return sacrifice_dir
 
+def benchmark_get_FSDir_from_shell_transcript(lines: Iterable[str], levels: Iterable[int] = (logging.DEBUG, logging.INFO)) -> Dict[str, float]:
+    """Parse throughput (lines per second) at each logging level, with debug output sent to os.devnull"""
+    global logger
+    lines = list(lines)
+    throughput = dict()
+    previous_logger = logger
+    try:
+        with open(os.devnull, 'w') as devnull:
+            for level in levels:
+                logger = logging.Logger(__name__)
+                logger.addHandler(logging.StreamHandler(devnull))
+                logger.setLevel(level)
+                start = time.perf_counter()
+                get_FSDir_from_shell_transcript(lines)
+                elapsed = time.perf_counter() - start
+                throughput[logging.getLevelName(level)] = len(lines) / elapsed
+    finally:
+        logger = previous_logger
+    return throughput
+
 def main():
     global logger
     logger = logging.Logger(__name__)
     h = logging.StreamHandler()
     logger.addHandler(h)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(os.environ.get('LOG_LEVEL', 'DEBUG'))
 
     filepath = os.environ['INPUT_FILE']
-    p = pathlib.Path(filepath)
-    assert p.exists(), f"Want input, got: {filepath}"
-    logger.debug('Opening input file')
-    with open(p, 'r') as f:
-        lines = split_lines(f.read())
     logger.debug('Getting FSDir from shell transcript')
-    fsd = get_FSDir_from_shell_transcript(lines)
+    if filepath == '-':
+        fsd = get_FSDir_from_shell_transcript(sys.stdin)
+    else:
+        p = pathlib.Path(filepath)
+        assert p.exists(), f"Want input, got: {filepath}"
+        logger.debug('Opening input file')
+        with open(p, 'r') as f:
+            fsd = get_FSDir_from_shell_transcript(f)
 
     # part 1
     tot = size_of_filtered_dirs(fsd)
@@ -2,6 +2,7 @@ import pytest
 import textwrap
 from day04 import assignments
 import pathlib
+import io
 
 @pytest.fixture
 def demo_data():
@@ -80,8 +81,81 @@ def test_elf_assignments_with_partially_wasted_elf():
     assignments_with_partially_wasted_elf = assignments.elf_assignments_with_partially_wasted_elf(elf_assignments)
     assert assignments_with_partially_wasted_elf == expected_assignments_with_partially_wasted_elf
 
+def test_assignment_columns_from_file(demo_data_file):
+    columns = assignments.assignment_columns_from_file(demo_data_file)
+    elf_assignments = assignments.elf_assignments_from_file(demo_data_file)
+    assert columns == assignments.assignment_columns_from_assignments(elf_assignments)
+    assert len(columns) == 6
+    assert list(columns.start0) == [2, 2, 5, 2, 6, 2]
+    assert list(columns.end1) == [8, 5, 9, 7, 6, 8]
+
+def test_count_wasted_elf_assignments(demo_data_file):
+    columns = assignments.assignment_columns_from_file(demo_data_file)
+    assert assignments.count_fully_wasted_elf_assignments(columns) == 2
+    assert assignments.count_partially_wasted_elf_assignments(columns) == 4
+
+def test_count_wasted_elf_assignments_exhaustive():
+    ranges = [(a, b) for a in range(1, 6) for b in range(a, 6)]
+    elf_assignments = tuple((r0, r1) for r0 in ranges for r1 in ranges)
+    columns = assignments.assignment_columns_from_assignments(elf_assignments)
+    assert assignments.count_fully_wasted_elf_assignments(columns) == len(assignments.elf_assignments_with_fully_wasted_elf(elf_assignments))
+    assert assignments.count_partially_wasted_elf_assignments(columns) == len(assignments.elf_assignments_with_partially_wasted_elf(elf_assignments))
+
+@pytest.fixture
+def roster():
+    ranges = [(a, b) for a in range(1, 8) for b in range(a, 8, 2)]
+    return tuple(zip(ranges, reversed(ranges)))
+
+def _ranges_matching(roster, predicate):
+    return sorted(
+        (assignment_index, elf_index)
+        for assignment_index, assignment in enumerate(roster)
+        for elf_index, (first, last) in enumerate(assignment)
+        if predicate(first, last)
+    )
+
+@pytest.mark.parametrize("first_section, last_section", ((1, 1), (3, 5), (4, 4), (7, 7), (0, 9), (8, 9)))
+def test_section_index(roster, first_section, last_section):
+    index = assignments.SectionIndex(roster)
+    assert len(index) == 2 * len(roster)
+    assert sorted(index.overlapping(first_section, last_section)) == _ranges_matching(
+        roster, lambda first, last: first <= last_section and last >= first_section
+    )
+    assert sorted(index.stabbing(first_section)) == _ranges_matching(
+        roster, lambda first, last: first <= first_section <= last
+    )
+    assert sorted(index.containing(first_section, last_section)) == _ranges_matching(
+        roster, lambda first, last: first <= first_section and last >= last_section
+    )
+    assert sorted(index.contained_in(first_section, last_section)) == _ranges_matching(
+        roster, lambda first, last: first >= first_section and last <= last_section
+    )
+
+def test_section_index_fully_contained_ranges(demo_data_file):
+    index = assignments.SectionIndex(assignments.elf_assignments_from_file(demo_data_file))
+    contained_pairs = index.fully_contained_ranges()
+    assert ((3, 0), (3, 1)) in contained_pairs
+    assert ((4, 1), (4, 0)) in contained_pairs
+    assert ((0, 0), (1, 0)) in contained_pairs
+    assert all(container != contained for container, contained in contained_pairs)
+
+def test_section_index_empty():
+    index = assignments.SectionIndex(())
+    assert index.overlapping(1, 5) == []
+
 def test_main(monkeypatch, demo_data_file, capsys):
     monkeypatch.setenv('ELF_ASSIGNMENTS_FILE', str(demo_data_file))
     assignments.main()
     written_to_output = capsys.readouterr().out
     assert written_to_output == "2 elves available for reassignment\n4 elves could be put to better use\n"
+
+def test_count_wasted_elf_assignments_streaming(demo_data):
+    lines = iter(demo_data.split('\n'))
+    assert assignments.count_wasted_elf_assignments(lines) == (2, 4)
+
+def test_main_stdin(monkeypatch, demo_data, capsys):
+    monkeypatch.setenv('ELF_ASSIGNMENTS_FILE', '-')
+    monkeypatch.setattr('sys.stdin', io.StringIO(demo_data))
+    assignments.main()
+    written_to_output = capsys.readouterr().out
+    assert written_to_output == "2 elves available for reassignment\n4 elves could be put to better use\n"
@@ -1,4 +1,7 @@
 import pytest
+import asyncio
+import io
+import socket
 from day06 import marker
 
 _test_cases = (
@@ -30,6 +33,71 @@ find_first_start_of_message_marker_tcs = tuple(
 def test_find_first_start_of_message_marker(s, expected_first_start_of_message_marker_position):
     assert marker.find_first_start_of_message_marker(s) == expected_first_start_of_message_marker_position
 
+@pytest.mark.parametrize("num_distinct_characters", (1, 2, 4, 14))
+@pytest.mark.parametrize("s", tuple(tc[0] for tc in _test_cases) + ("", "aaaa", "abcabcabc", "abcd"))
+def test_make_sliding_marker_finder(s, num_distinct_characters):
+    expected = marker.make_marker_finder(num_distinct_characters)(s)
+    if expected is None:  # make_marker_finder falls through on an empty signal
+        expected = -1
+    assert marker.make_sliding_marker_finder(num_distinct_characters)(s) == expected
+
+@pytest.mark.parametrize("chunk_size", (1, 3, 1 << 16))
+@pytest.mark.parametrize("s, expected_first_marker_position, expected_first_start_of_message_marker_position", _test_cases, ids=(tc[0] for tc in _test_cases))
+def test_find_marker_in_stream(s, expected_first_marker_position, expected_first_start_of_message_marker_position, chunk_size):
+    stream = io.BytesIO(s.encode())
+    assert marker.find_marker_in_stream(stream, 4, chunk_size=chunk_size) == expected_first_marker_position
+    stream = io.BytesIO(s.encode())
+    assert marker.find_marker_in_stream(stream, 14, chunk_size=chunk_size) == expected_first_start_of_message_marker_position
+
+def test_find_marker_in_stream_stops_reading_at_marker():
+    stream = io.BytesIO(b"abcd" + b"x" * 100)
+    assert marker.find_marker_in_stream(stream, 4, chunk_size=2) == 4
+    assert stream.tell() == 4
+
+def test_find_marker_in_stream_not_found():
+    assert marker.find_marker_in_stream(io.BytesIO(b"abcabc"), 4) == -1
+
+def test_find_marker_in_stream_socket():
+    reader, writer = socket.socketpair()
+    with reader, writer:
+        writer.sendall(_test_cases[0][0].encode())
+        writer.shutdown(socket.SHUT_WR)
+        assert marker.find_marker_in_stream(reader, 14, chunk_size=5) == 23
+
+def test_find_marker_in_async_stream():
+    async def scan():
+        stream = asyncio.StreamReader()
+        stream.feed_data(_test_cases[2][0].encode())
+        stream.feed_eof()
+        return await marker.find_marker_in_async_stream(stream, 4, chunk_size=3)
+    assert asyncio.run(scan()) == 10
+
+def test_iter_all_markers():
+    markers = list(marker.iter_all_markers("aabcab", (2, 3, 4)))
+    assert markers == [(2, 3), (2, 4), (3, 4), (2, 5), (3, 5), (2, 6), (3, 6)]
+
+@pytest.mark.parametrize("s", tuple(tc[0] for tc in _test_cases))
+def test_iter_all_markers_matches_finder(s):
+    widths = (1, 4, 14)
+    markers = list(marker.iter_all_markers(s, widths))
+    for width in widths:
+        positions = [position for width_, position in markers if width_ == width]
+        expected = [i + width for i in range(len(s) - width + 1) if len(set(s[i:i + width])) == width]
+        assert positions == expected
+
+@pytest.mark.parametrize("s, expected_first_marker_position, expected_first_start_of_message_marker_position", _test_cases, ids=(tc[0] for tc in _test_cases))
+def test_find_first_markers(s, expected_first_marker_position, expected_first_start_of_message_marker_position):
+    assert marker.find_first_markers(s, (4, 14)) == {4: expected_first_marker_position, 14: expected_first_start_of_message_marker_position}
+    assert marker.find_first_markers(s, (27,)) == {27: -1}
+
+@pytest.mark.parametrize("block_size", (1, 5, 1 << 20))
+@pytest.mark.parametrize("num_distinct_characters", (1, 2, 4, 14))
+@pytest.mark.parametrize("s", tuple(tc[0] for tc in _test_cases) + ("", "aaaa", "abcabcabc", "abcd", "\x00\x00\x01\x02\x03"))
+def test_make_bitset_marker_finder(s, num_distinct_characters, block_size):
+    expected = marker.make_sliding_marker_finder(num_distinct_characters)(s)
+    assert marker.make_bitset_marker_finder(num_distinct_characters, block_size=block_size)(s) == expected
+    assert marker.make_bitset_marker_finder(num_distinct_characters, block_size=block_size)(s.encode('latin-1')) == expected
+
 @pytest.fixture
 def signal_file(tmpdir):
     fp = tmpdir / 'signal_file.txt'
@@ -37,6 +105,37 @@ def signal_file(tmpdir):
         f.write(find_first_marker_tcs[0][0])
     return fp
 
+@pytest.fixture
+def long_signal_file(tmpdir):
+    fp = tmpdir / 'long_signal_file.txt'
+    signal = "abcabcabcd" * 50 + "abcdefghijklmn" + "a" * 200
+    with open(fp, 'w') as f:
+        f.write(signal)
+    return fp, signal
+
+@pytest.mark.parametrize("num_distinct_characters", (4, 5, 14, 15))
+@pytest.mark.parametrize("processes", (1, 3, 7))
+def test_find_marker_in_file_parallel(long_signal_file, num_distinct_characters, processes):
+    fp, signal = long_signal_file
+    expected = marker.make_marker_finder(num_distinct_characters)(signal)
+    assert marker.find_marker_in_file_parallel(fp, num_distinct_characters, processes=processes) == expected
+
+def test_find_marker_in_shard_straddling_boundary(long_signal_file):
+    fp, signal = long_signal_file
+    marker_start = signal.index("abcdefghijklmn")
+    assert marker.find_marker_in_shard(fp, marker_start, marker_start + 1, 14) == marker_start + 14
+    assert marker.find_marker_in_shard(fp, marker_start + 1, len(signal), 14) == marker_start + 15
+    assert marker.find_marker_in_shard(fp, marker_start + 14, len(signal), 14) == -1
+
+def test_shard_ranges():
+    assert marker.shard_ranges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert marker.shard_ranges(2, 4) == [(0, 1), (1, 2)]
+
+def test_benchmark_find_marker_in_file_parallel(long_signal_file):
+    fp, _ = long_signal_file
+    throughput = marker.benchmark_find_marker_in_file_parallel(fp, 14, process_counts=(1, 2))
+    assert set(throughput) == {1, 2}
+
 def test_get_signal_from_file(signal_file):
     assert marker.get_signal_from_file(signal_file) == find_first_marker_tcs[0][0]
 
@@ -2,6 +2,7 @@ import pytest
 import day07.nix_fs
 from day07 import nix_fs
 import textwrap
+import io
 import logging
 
 @pytest.fixture(autouse=True)
@@ -64,8 +65,144 @@ def test_directory_to_sacrifice(sample_lines):
     sacrifice_dir = nix_fs.directory_to_sacrifice(fsd)
     assert sacrifice_dir._name == 'd'
 
+def test_size_cache_invalidation(sample_lines):
+    fsd = nix_fs.get_FSDir_from_shell_transcript(sample_lines)
+    assert fsd.size == 48381165
+    a = fsd.cd('a')
+    e = a.cd('e')
+    assert e.size == 584
+    e.add_file('new', 16)
+    assert e.size == 600
+    assert a.size == 94869
+    assert fsd.size == 48381181
+    assert fsd.cd('d').size == 24933642
+    e.add_subdir('x')
+    e.cd('x').add_file('y', 4)
+    assert fsd.size == 48381185
+
+def test_size_deep_tree():
+    lines = ['$ cd /'] + [line for i in range(5000) for line in (f'dir d{i}', f'$ cd d{i}', '1 f')]
+    fsd = nix_fs.get_FSDir_from_shell_transcript(lines)
+    assert fsd.size == 5000
+
+def test_registry_per_tree(sample_lines):
+    fsd = nix_fs.get_FSDir_from_shell_transcript(sample_lines)
+    other = nix_fs.get_FSDir_from_shell_transcript(['$ cd /', 'dir x', '$ cd x', 'dir y'])
+    assert [fsd_.name for _, fsd_ in other] == ['/', 'x', 'y']
+    assert [fsd_.name for _, fsd_ in fsd] == ['/', 'a', 'd', 'e']
+    assert all(fsd_.root is fsd for _, fsd_ in fsd)
+    assert 'x' not in [fsd_.name for _, fsd_ in fsd.cd('a')]
+
+def test_compact_fs_tree(sample_lines):
+    fsd = nix_fs.get_FSDir_from_shell_transcript(sample_lines, compact=True)
+    assert isinstance(fsd, nix_fs.CompactFSDir)
+    assert len(list(fsd)) == 4
+    assert fsd.size == 48381165
+    assert fsd.cd('a').cd('e').size == 584
+    assert fsd.cd('a').cd('e').cd('..').cd('..') == fsd
+    assert nix_fs.size_of_filtered_dirs(fsd) == 95437
+    sacrifice_dir = nix_fs.directory_to_sacrifice(fsd)
+    assert sacrifice_dir.name == 'd'
+    assert sacrifice_dir.size == 24933642
+
+def test_compact_fs_tree_errors():
+    tree = nix_fs.CompactFSTree()
+    with pytest.raises(ValueError):
+        tree.root.cd('..')
+    with pytest.raises(FileNotFoundError):
+        tree.root.cd('missing')
+
+def test_compact_fs_tree_updates_sizes():
+    tree = nix_fs.CompactFSTree()
+    a = tree.add_subdir(0, 'a')
+    assert tree.add_subdir(0, 'a') == a
+    tree.add_file(a, 10)
+    assert tree.size(0) == 10
+    b = tree.add_subdir(a, 'b')
+    tree.add_file(b, 5)
+    assert tree.size(0) == 15
+    assert tree.size(a) == 15
+    assert list(tree.children(0)) == [a]
+
+class CountingName(str):
+    """Directory/file name that counts how often it is formatted"""
+    formatted = 0
+
+    def __str__(self):
+        CountingName.formatted += 1
+        return super().__str__()
+
+    def __repr__(self):
+        CountingName.formatted += 1
+        return super().__repr__()
+
+    def __format__(self, spec):
+        CountingName.formatted += 1
+        return super().__format__(spec)
+
+def _exercise_with_counting_names(sample_lines, monkeypatch):
+    """Drive the parser and FSDir methods, returning how many times log arguments were formatted"""
+    CountingName.formatted = 0
+    fsdir_reprs = []
+    original_repr = nix_fs.FSDir.__repr__
+    def counting_repr(self):
+        fsdir_reprs.append(self)
+        return original_repr(self)
+    monkeypatch.setattr(nix_fs.FSDir, '__repr__', counting_repr)
+    fsd = nix_fs.get_FSDir_from_shell_transcript(sample_lines)
+    fsd.add_subdir(CountingName('x'))
+    fsd.cd(CountingName('x')).add_file(CountingName('y'), 1)
+    assert fsd.size == 48381166
+    return CountingName.formatted + len(fsdir_reprs)
+
+def test_debug_logging_is_lazy(sample_lines, monkeypatch):
+    nix_fs.logger.setLevel(logging.INFO)
+    assert _exercise_with_counting_names(sample_lines, monkeypatch) == 0
+
+def test_debug_logging_formats_at_debug(sample_lines, monkeypatch):
+    nix_fs.logger.setLevel(logging.DEBUG)
+    assert _exercise_with_counting_names(sample_lines, monkeypatch) > 0
+
+def test_benchmark_get_FSDir_from_shell_transcript(sample_lines):
+    logger = nix_fs.logger
+    throughput = nix_fs.benchmark_get_FSDir_from_shell_transcript(sample_lines)
+    assert set(throughput) == {'DEBUG', 'INFO'}
+    assert nix_fs.logger is logger
+
+def test_compact_fs_tree_wide_directory(monkeypatch):
+    def no_sibling_walk(self, index):
+        raise AssertionError("child lookup must use the child index, not walk siblings")
+    monkeypatch.setattr(nix_fs.CompactFSTree, 'children', no_sibling_walk)
+    num_subdirs = 2000
+    lines = ['$ cd /', '$ ls'] + [f'dir d{i}' for i in range(num_subdirs)]
+    for i in range(num_subdirs):
+        lines += [f'$ cd d{i}', '$ ls', '1 f', '$ cd ..']
+    lines += [f'dir d{i}' for i in range(num_subdirs)]  # listing again finds the existing subdirectories
+    fsd = nix_fs.get_FSDir_from_shell_transcript(lines, compact=True)
+    assert len(list(fsd)) == num_subdirs + 1
+    assert fsd.size == num_subdirs
+    assert fsd.cd(f'd{num_subdirs - 1}').size == 1
+
 def test_main(sample_file, monkeypatch, capsys):
     monkeypatch.setenv('INPUT_FILE', str(sample_file))
     nix_fs.main()
     written_to_output = capsys.readouterr().out
     assert written_to_output == 'Total size of dirs of size <=100000: 95437\nTotal size of sacrifice directory: 24933642\n'
+
+def test_get_FSDir_from_shell_transcript_streaming(sample_file):
+    with open(sample_file, 'r') as f:
+        fsd = nix_fs.get_FSDir_from_shell_transcript(f)
+    assert fsd.size == 48381165
+    assert nix_fs.size_of_filtered_dirs(fsd) == 95437
+
+def test_get_FSDir_from_shell_transcript_crlf(sample):
+    lines = io.StringIO(sample.replace('\n', '\r\n'), newline='')
+    fsd = nix_fs.get_FSDir_from_shell_transcript(lines)
+    assert fsd.cd('a').cd('e').size == 584
+
+def test_main_stdin(sample, monkeypatch, capsys):
+    monkeypatch.setenv('INPUT_FILE', '-')
+    monkeypatch.setattr('sys.stdin', io.StringIO(sample))
+    nix_fs.main()
+    written_to_output = capsys.readouterr().out
+    assert written_to_output == 'Total size of dirs of size <=100000: 95437\nTotal size of sacrifice directory: 24933642\n'
@@ -83,6 +83,149 @@ def test_execute_rearrangement_procedure(initial_stacks, rearrangement_procedure
     new_stacks = rearrangement.execute_rearrangement_procedure(initial_stacks, rearrangement_procedure)
     assert new_stacks == expected_final_stacks
 
+@pytest.mark.parametrize("multi_crate_mover, expected_final_stacks", (
+    (False, [['A'], ['D', 'E', 'C', 'B']]),
+    (True, [['C'], ['D', 'E', 'A', 'B']]),
+))
+def test_execute_rearrangement_procedure_in_place(multi_crate_mover, expected_final_stacks):
+    initial_stacks = [['A', 'B', 'C'], ['D', 'E']]
+    snapshot = rearrangement.snapshot_stacks(initial_stacks)
+    new_stacks = rearrangement.execute_rearrangement_procedure(snapshot, ['move 3 from 1 to 2', 'move 1 from 2 to 1'], multi_crate_mover, in_place=True)
+    assert new_stacks is snapshot
+    assert new_stacks == expected_final_stacks
+    assert initial_stacks == [['A', 'B', 'C'], ['D', 'E']]
+
+def test_execute_rearrangement_procedure_leaves_input_untouched():
+    initial_stacks = [['A', 'B', 'C'], ['D', 'E']]
+    new_stacks = rearrangement.execute_rearrangement_procedure(initial_stacks, ['move 2 from 1 to 2'])
+    assert new_stacks == [['A'], ['D', 'E', 'C', 'B']]
+    assert initial_stacks == [['A', 'B', 'C'], ['D', 'E']]
+
+def test_move_item_from_stack_to_stack_too_many_crates():
+    with pytest.raises(IndexError):
+        rearrangement.move_item_from_stack_to_stack([['A'], []], 1, 2, k=2, in_place=True)
+
+def test_compile_rearrangement_procedure():
+    compiled = rearrangement.compile_rearrangement_procedure(['move 1 from 2 to 1', 'move 13 from 1 to 3'])
+    assert list(compiled) == [1, 2, 1, 13, 1, 3]
+    assert list(rearrangement.iter_compiled_rearrangements(compiled)) == [(1, 2, 1), (13, 1, 3)]
+
+@pytest.mark.parametrize("multi_crate_mover, expected_top_crates", ((False, 'CMZ'), (True, 'MCD')))
+def test_execute_compiled_rearrangement_procedure(sample, multi_crate_mover, expected_top_crates):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    for _ in range(2):
+        new_stacks = rearrangement.execute_compiled_rearrangement_procedure(initial_stacks, compiled, multi_crate_mover)
+        assert rearrangement.get_top_crate_from_each_stack(new_stacks) == expected_top_crates
+    assert initial_stacks == [['Z', 'N'], ['M', 'C', 'D'], ['P']]
+
+@pytest.mark.parametrize("multi_crate_mover, expected_top_crates", ((False, 'CMZ'), (True, 'MCD')))
+def test_get_top_crate_from_each_stack_by_tracing(sample, multi_crate_mover, expected_top_crates):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    top_crates = rearrangement.get_top_crate_from_each_stack_by_tracing(initial_stacks, compiled, multi_crate_mover)
+    assert top_crates == expected_top_crates
+
+@pytest.mark.parametrize("multi_crate_mover", (False, True))
+def test_get_top_crate_from_each_stack_by_tracing_matches_simulation(multi_crate_mover):
+    initial_stacks = [list('ABCDEFG'), list('HIJ'), list('KLMNOP'), list('QR')]
+    procedure = [
+        'move 3 from 1 to 2', 'move 2 from 3 to 4', 'move 5 from 2 to 1', 'move 1 from 4 to 3',
+        'move 4 from 1 to 4', 'move 2 from 4 to 2', 'move 3 from 3 to 1', 'move 1 from 2 to 3',
+        'move 3 from 1 to 1',
+    ]
+    compiled = rearrangement.compile_rearrangement_procedure(procedure)
+    simulated = rearrangement.execute_compiled_rearrangement_procedure(initial_stacks, compiled, multi_crate_mover)
+    top_crates = rearrangement.get_top_crate_from_each_stack_by_tracing(initial_stacks, compiled, multi_crate_mover)
+    assert top_crates == rearrangement.get_top_crate_from_each_stack(simulated)
+
+def test_rope_stack():
+    stack = rearrangement.RopeStack('ABCDE')
+    assert len(stack) == 5 and stack.top() == 'E'
+    moved = stack.take(2)
+    assert stack.to_list() == ['A', 'B', 'C']
+    stack.put(moved, reverse=True)
+    assert stack.to_list() == ['A', 'B', 'C', 'E', 'D']
+    moved = stack.take(3)
+    assert stack.to_list() == ['A', 'B'] and stack.top() == 'B'
+    stack.put(moved, reverse=True)
+    assert stack.to_list() == ['A', 'B', 'D', 'E', 'C']
+    with pytest.raises(IndexError):
+        stack.take(6)
+    with pytest.raises(IndexError):
+        rearrangement.RopeStack().top()
+
+@pytest.mark.parametrize("multi_crate_mover", (False, True))
+def test_execute_compiled_rearrangement_procedure_on_rope_stacks(multi_crate_mover):
+    initial_stacks = [list('ABCDEFG'), list('HIJ'), list('KLMNOP'), list('QR')]
+    procedure = [
+        'move 3 from 1 to 2', 'move 2 from 3 to 4', 'move 5 from 2 to 1', 'move 1 from 4 to 3',
+        'move 4 from 1 to 4', 'move 2 from 4 to 2', 'move 3 from 3 to 1', 'move 1 from 2 to 3',
+        'move 3 from 1 to 1',
+    ]
+    compiled = rearrangement.compile_rearrangement_procedure(procedure)
+    simulated = rearrangement.execute_compiled_rearrangement_procedure(initial_stacks, compiled, multi_crate_mover)
+    rope_stacks = rearrangement.execute_compiled_rearrangement_procedure_on_rope_stacks(
+        rearrangement.rope_stacks_from_stacks(initial_stacks), compiled, multi_crate_mover
+    )
+    assert [stack.to_list() for stack in rope_stacks] == simulated
+
+def test_benchmark_stack_representations(sample):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    timings = rearrangement.benchmark_stack_representations(initial_stacks, compiled)
+    assert set(timings) == {'list', 'rope'}
+
+@pytest.mark.parametrize("multi_crate_mover", (False, True))
+def test_benchmark_stack_representations_fragmenting_case(multi_crate_mover):
+    initial_stacks, compiled = rearrangement.fragmenting_benchmark_case(num_crates=300, num_block_moves=6)
+    assert len(compiled) == 3 * 306
+    timings = rearrangement.benchmark_stack_representations(initial_stacks, compiled, multi_crate_mover)
+    assert set(timings) == {'list', 'rope'}
+
+@pytest.mark.parametrize("multi_crate_mover", (False, True))
+@pytest.mark.parametrize("checkpoint_interval", (1, 2, 3, 4, 5))
+def test_checkpointed_rearrangement(sample, multi_crate_mover, checkpoint_interval):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    checkpointed = rearrangement.CheckpointedRearrangement(initial_stacks, compiled, multi_crate_mover, checkpoint_interval=checkpoint_interval)
+    assert len(checkpointed) == 4
+    for step in range(len(checkpointed) + 1):
+        expected = rearrangement.execute_compiled_rearrangement_procedure(initial_stacks, compiled[:3 * step], multi_crate_mover)
+        assert checkpointed.stacks_after(step) == expected
+    assert checkpointed.stacks_after(4) == checkpointed.final_stacks
+    with pytest.raises(IndexError):
+        checkpointed.stacks_after(5)
+
+def test_checkpointed_rearrangement_memory_budget(sample):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    checkpointed = rearrangement.CheckpointedRearrangement(initial_stacks, compiled, memory_budget=12)
+    assert checkpointed.checkpoint_interval == 3
+    assert rearrangement.get_top_crate_from_each_stack(checkpointed.stacks_after(4)) == 'CMZ'
+
+def test_checkpointed_rearrangement_budget_too_small(sample):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    with pytest.raises(ValueError):
+        rearrangement.CheckpointedRearrangement(initial_stacks, compiled, memory_budget=5)
+    assert rearrangement.CheckpointedRearrangement(initial_stacks, compiled, memory_budget=6).checkpoint_interval == 5
+
+def test_checkpointed_rearrangement_interval_and_budget(sample):
+    lines = rearrangement.get_lines_from_text(sample)
+    initial_stacks, compiled = rearrangement.get_initial_stacks_and_compiled_procedure_from_lines(lines)
+    # 4 steps, 6 crates: interval 2 keeps checkpoints at steps 0, 2 and 4
+    with pytest.raises(ValueError):
+        rearrangement.CheckpointedRearrangement(initial_stacks, compiled, checkpoint_interval=2, memory_budget=17)
+    checkpointed = rearrangement.CheckpointedRearrangement(initial_stacks, compiled, checkpoint_interval=2, memory_budget=18)
+    assert checkpointed.checkpoint_interval == 2
+    assert rearrangement.get_top_crate_from_each_stack(checkpointed.stacks_after(4)) == 'CMZ'
+
+def test_checkpointed_rearrangement_multi_character_crates():
+    compiled = rearrangement.compile_rearrangement_procedure(['move 1 from 1 to 2'])
+    with pytest.raises(AssertionError):
+        rearrangement.CheckpointedRearrangement([['AB'], []], compiled)
+
 def test_get_rearranged_stacks_from_lines(sample):
     lines = rearrangement.get_lines_from_text(sample)
     new_stacks = rearrangement.get_rearranged_stacks_from_lines(lines)
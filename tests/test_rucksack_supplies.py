@@ -38,6 +38,20 @@ def test_get_three_elf_groups_from_rucksacks(rucksack_file):
         ['wMqvLMZHhHMvwLHjbvcjnnSBnvTQFn', 'ttgJtRGJQctTZtZT', 'CrZsJsPPZsGzwwsLwLmpwMDw']
     ]
 
+def test_iter_three_elf_groups_from_rucksacks(rucksack_file):
+    rucksacks = rucksack_supplies.iter_rucksacks_from_file(rucksack_file)
+    three_elf_groups = rucksack_supplies.iter_three_elf_groups_from_rucksacks(rucksacks)
+    assert list(three_elf_groups) == rucksack_supplies.get_three_elf_groups_from_rucksacks(
+        rucksack_supplies.get_rucksacks_from_file(rucksack_file)
+    )
+
+def test_iter_three_elf_groups_from_rucksacks_partial_group(rucksack_file):
+    rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file)[:5]
+    three_elf_groups = rucksack_supplies.iter_three_elf_groups_from_rucksacks(rucksacks)
+    assert next(three_elf_groups) == rucksacks[:3]
+    with pytest.raises(RuntimeError, match="Insufficient elfs"):
+        next(three_elf_groups)
+
 def test_get_badge_item_from_three_elf_group(rucksack_file):
     rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file)
     three_elf_groups = rucksack_supplies.get_three_elf_groups_from_rucksacks(rucksacks)
@@ -102,8 +116,94 @@ def test_get_total_rucksack_item_priority(rucksack_file):
     total_priority = rucksack_supplies.get_total_rucksack_item_priority(rucksacks)
     assert total_priority == 157
 
+def test_get_total_priorities(rucksack_file):
+    rucksacks = rucksack_supplies.iter_rucksacks_from_file(rucksack_file)
+    assert rucksack_supplies.get_total_priorities(rucksacks) == (157, 70)
+
+def test_iter_rucksack_chunks():
+    chunks = list(rucksack_supplies.iter_rucksack_chunks(map(str, range(14)), groups_per_chunk=2))
+    assert [len(chunk) for chunk in chunks] == [6, 6, 2]
+
+@pytest.mark.parametrize("processes, groups_per_chunk", ((1, 1), (2, 1), (2, 10)))
+def test_get_total_priorities_parallel(rucksack_file, processes, groups_per_chunk):
+    rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file) * 5
+    assert rucksack_supplies.get_total_priorities_parallel(rucksacks, processes=processes, groups_per_chunk=groups_per_chunk) == (157 * 5, 70 * 5)
+
+def test_get_total_priorities_parallel_partial_group(rucksack_file):
+    rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file)[:4]
+    with pytest.raises(RuntimeError, match="Insufficient elfs"):
+        rucksack_supplies.get_total_priorities_parallel(rucksacks, processes=2, groups_per_chunk=1)
+
+def test_get_total_priorities_parallel_bounded_in_flight(rucksack_file, monkeypatch):
+    pending = []
+    max_pending = []
+
+    class RecordingFuture:
+        def __init__(self, value):
+            self._value = value
+        def result(self):
+            pending.remove(self)
+            return self._value
+
+    class RecordingExecutor:
+        def __init__(self, max_workers):
+            pass
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc_info):
+            return False
+        def submit(self, fn, *args):
+            future = RecordingFuture(fn(*args))
+            pending.append(future)
+            max_pending.append(len(pending))
+            return future
+
+    monkeypatch.setattr(rucksack_supplies.concurrent.futures, 'ProcessPoolExecutor', RecordingExecutor)
+    rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file) * 20
+    totals = rucksack_supplies.get_total_priorities_parallel(iter(rucksacks), processes=1, groups_per_chunk=1, max_in_flight=3)
+    assert totals == (157 * 20, 70 * 20)
+    assert len(max_pending) == 40
+    assert max(max_pending) == 3
+    assert pending == []
+
+def test_benchmark_get_total_priorities_parallel(rucksack_file):
+    throughput = rucksack_supplies.benchmark_get_total_priorities_parallel(rucksack_file, worker_counts=(1, 2))
+    assert set(throughput) == {1, 2}
+    assert all(rate > 0 for rate in throughput.values())
+
+def test_main_parallel(rucksack_file, monkeypatch, capsys):
+    monkeypatch.setenv('RUCKSACK_FILE', str(rucksack_file))
+    monkeypatch.setenv('RUCKSACK_PROCESSES', '2')
+    rucksack_supplies.main()
+    written_to_output = capsys.readouterr().out
+    assert written_to_output == "Total priority (part 1): 157\nTotal badge priority (part 2): 70\n"
+
 def test_main(rucksack_file, monkeypatch, capsys):
     monkeypatch.setenv('RUCKSACK_FILE', str(rucksack_file))
     rucksack_supplies.main()
     written_to_output = capsys.readouterr().out
     assert written_to_output == "Total priority (part 1): 157\nTotal badge priority (part 2): 70\n"
+
+def test_get_items_mask():
+    assert rucksack_supplies.get_items_mask('') == 0
+    assert rucksack_supplies.get_items_mask('aaZ') == (1 << 1) | (1 << 52)
+
+@pytest.mark.parametrize(
+    "manifest, expected_priority", _rucksack_item_priority_test_cases, ids=(tc[0] for tc in _rucksack_item_priority_test_cases)
+)
+def test_get_rucksack_item_priority_bitmask(manifest, expected_priority):
+    assert rucksack_supplies.get_rucksack_item_priority_bitmask(manifest) == expected_priority
+
+def test_get_rucksack_item_priority_bitmask_no_duplicate():
+    with pytest.raises(RuntimeError):
+        rucksack_supplies.get_rucksack_item_priority_bitmask('abcd')
+
+def test_get_total_rucksack_item_priority_bitmask(rucksack_file):
+    rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file)
+    assert rucksack_supplies.get_total_rucksack_item_priority_bitmask(rucksacks) == 157
+
+def test_get_total_three_elf_group_badge_priority_bitmask(rucksack_file):
+    rucksacks = rucksack_supplies.get_rucksacks_from_file(rucksack_file)
+    assert rucksack_supplies.get_total_three_elf_group_badge_priority_bitmask(rucksacks) == 70
+    with pytest.raises(RuntimeError, match="Insufficient elfs"):
+        rucksack_supplies.get_total_three_elf_group_badge_priority_bitmask(rucksacks[:4])
@@ -47,6 +47,107 @@ def test_rounds_from_file(sample_rounds_file):
     rounds = tournament.rounds_from_file(sample_rounds_file)
     assert rounds == [('A', 'Y'), ('B', 'X'), ('C', 'Z')]
 
+def test_iter_rounds_from_file(sample_rounds_file):
+    rounds = tournament.iter_rounds_from_file(sample_rounds_file)
+    assert not isinstance(rounds, list)
+    assert list(rounds) == [('A', 'Y'), ('B', 'X'), ('C', 'Z')]
+
+def test_total_final_scores(sample_rounds_file):
+    rounds = tournament.iter_rounds_from_file(sample_rounds_file)
+    assert tournament.total_final_scores(rounds) == (15, 12)
+
+def test_round_key_counts_from_bytes():
+    counts = tournament.round_key_counts_from_bytes(b"A Y\nB X\nC Z\nA Y\n")
+    assert counts == dict(AX=0, BX=1, CX=0, AY=2, BY=0, CY=0, AZ=0, BZ=0, CZ=1)
+
+@pytest.mark.parametrize("chunk_size", (1, 3, 4, 1 << 20))
+def test_round_key_counts_from_file(sample_rounds_file, chunk_size):
+    counts = tournament.round_key_counts_from_file(sample_rounds_file, chunk_size=chunk_size)
+    assert counts == dict(AX=0, BX=1, CX=0, AY=1, BY=0, CY=0, AZ=0, BZ=0, CZ=1)
+    assert tournament.total_final_scores_from_counts(counts) == (15, 12)
+
+@pytest.fixture
+def large_rounds_file(tmpdir):
+    file = tmpdir / 'rounds_large.txt'
+    keys = tuple(tournament.final_score)
+    rounds = [(keys[(i * 7) % 9][0], keys[(i * 7) % 9][1]) for i in range(1000)]
+    with open(file, 'w') as f:
+        f.write(''.join(f"{them} {us}\n" for them, us in rounds))
+    return file, rounds
+
+@pytest.mark.parametrize("num_shards", (1, 2, 3, 7, 5000))
+def test_shard_offsets(large_rounds_file, num_shards):
+    file, _ = large_rounds_file
+    shards = tournament.shard_offsets(file, num_shards)
+    assert 0 < len(shards) <= num_shards
+    assert shards[0][0] == 0
+    assert shards[-1][1] == file.size()
+    contents = open(file, 'rb').read()
+    for (start, end), (next_start, _) in zip(shards, shards[1:]):
+        assert end == next_start
+        assert contents[end-1:end] == b'\n'
+
+@pytest.mark.parametrize("processes", (1, 3))
+def test_round_key_counts_from_file_parallel(large_rounds_file, processes):
+    file, rounds = large_rounds_file
+    counts = tournament.round_key_counts_from_file_parallel(file, processes=processes, chunk_size=5)
+    assert tournament.total_final_scores_from_counts(counts) == (
+        tournament.total_final_score(rounds),
+        tournament.total_final_score_sneaky(rounds),
+    )
+
+def test_compile_rule_set():
+    assert tournament.compile_rule_set(tournament.round_score, tournament.my_selection_score) == tournament.final_score
+    assert tournament.compile_rule_set(
+        tournament.round_score, tournament.my_selection_score, tournament.round_redirection_map
+    ) == tournament.sneaky_final_score
+
+def test_score_counts_against_rule_sets(sample_rounds_file):
+    counts = tournament.round_key_counts_from_file(sample_rounds_file)
+    selection_only = tournament.compile_rule_set(dict.fromkeys(tournament.round_score, 0), tournament.my_selection_score)
+    totals = tournament.score_counts_against_rule_sets(
+        counts, (tournament.final_score, tournament.sneaky_final_score, selection_only)
+    )
+    assert totals == [15, 12, 6]
+
+@pytest.mark.parametrize("data", (
+    b"A Y\nB  X\nQ Z\nC Z\n",
+    b"A Y\nQ Z\n",
+    b"A XB Y\n",
+    b"A X\rB Y\n",
+    b" A X\n",
+    b"xA X\n",
+    b"A X\tB\n",
+))
+def test_round_key_counts_from_bytes_malformed(data):
+    with pytest.raises(ValueError):
+        tournament.round_key_counts_from_bytes(data)
+
+def test_round_key_counts_from_bytes_blank_lines_and_crlf():
+    counts = tournament.round_key_counts_from_bytes(b"A Y\r\n\nB X\r\nC Z")
+    assert tournament.total_final_scores_from_counts(counts) == (15, 12)
+
+def test_round_key_counts_from_file_malformed(tmpdir):
+    file = tmpdir / 'rounds_malformed.txt'
+    with open(file, 'wb') as f:
+        f.write(b"A Y\nB  X\nQ Z\nC Z\n")
+    with pytest.raises(ValueError):
+        tournament.round_key_counts_from_file(file)
+
+@pytest.mark.parametrize("processes", (1, 3))
+def test_round_key_counts_from_file_parallel_malformed(large_rounds_file, tmpdir, processes):
+    file, rounds = large_rounds_file
+    malformed_file = tmpdir / 'rounds_large_malformed.txt'
+    lines = open(file, 'rb').read().split(b'\n')
+    lines[len(lines) * 2 // 3] = b'B  X'
+    with open(malformed_file, 'wb') as f:
+        f.write(b'\n'.join(lines))
+    with pytest.raises(ValueError):
+        tournament.round_key_counts_from_file_parallel(malformed_file, processes=processes, chunk_size=64)
+    start, end = tournament.shard_offsets(malformed_file, 3)[-1]
+    with pytest.raises(ValueError):
+        tournament.round_key_counts_from_shard(malformed_file, start, end)
+
 def test_main(sample_rounds_file, monkeypatch, capsys):
     monkeypatch.setenv('TOURNAMENTS_FILE', str(sample_rounds_file))
     tournament.main()